@@ -0,0 +1,121 @@
+import math
+import threading
+
+
+# (downscale factor, HOG upsamples), cheapest first. face_locations()
+# defaults to one upsample, so (0.25, 1) is the old fixed setting.
+QUALITY_LEVELS = [
+    (0.2, 0),
+    (0.25, 0),
+    (0.25, 1),
+    (0.33, 1),
+    (0.5, 1),
+]
+DEFAULT_LEVEL = 2
+TARGET_FPS = 15.0
+MAX_LATENCY_MS = 150.0
+MAX_STRIDE = 6
+
+
+class AdaptiveController:
+    """
+    Picks the detection settings for the next frame from measured cost.
+
+    Two targets: `max_latency_ms` bounds the time of one full detection +
+    encoding pass, and is met by moving along QUALITY_LEVELS (smaller
+    downscale, fewer upsamples when too slow; more when there is plenty of
+    headroom). `target_fps` bounds the average cost per frame, and is met
+    by the detection stride: only every Nth frame is detected, the others
+    reuse the tracked faces. Cost is an exponential moving average of
+    detection passes; quality changes wait `cooldown` detections so one
+    slow frame does not make it oscillate, and a level measured over
+    budget is only retried after `retry_after` detections.
+    """
+
+    def __init__(self, target_fps=TARGET_FPS, max_latency_ms=MAX_LATENCY_MS,
+                 level=DEFAULT_LEVEL, levels=QUALITY_LEVELS, max_stride=MAX_STRIDE,
+                 alpha=0.2, cooldown=10, retry_after=300):
+        self.target_fps = target_fps
+        self.max_latency_ms = max_latency_ms
+        self.levels = levels
+        self.level = level
+        self.max_stride = max_stride
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.retry_after = retry_after
+
+        self.stride = 1
+        self.detect_ms = None
+        self.changes = 0
+        self._frame = 0
+        self._since_change = 0
+        self._detections = 0
+        self._level_ms = {}
+        self._lock = threading.Lock()
+
+    @property
+    def scale(self):
+        return self.levels[self.level][0]
+
+    @property
+    def upsample(self):
+        return self.levels[self.level][1]
+
+    def should_detect(self):
+        """Called once per frame; False means reuse the previous faces"""
+        with self._lock:
+            detect = self._frame % self.stride == 0
+            self._frame += 1
+            return detect
+
+    def record(self, seconds):
+        """Feed the duration of one detection pass and adjust the settings"""
+        ms = 1000.0 * seconds
+        with self._lock:
+            if self.detect_ms is None:
+                self.detect_ms = ms
+            else:
+                self.detect_ms += self.alpha * (ms - self.detect_ms)
+            self._since_change += 1
+            self._detections += 1
+
+            budget = 1000.0 / self.target_fps
+            self.stride = max(1, min(self.max_stride,
+                                     math.ceil(self.detect_ms / budget)))
+
+            if self._since_change >= self.cooldown:
+                if self.detect_ms > 1.1 * self.max_latency_ms and self.level > 0:
+                    self._set_level(self.level - 1)
+                elif (self.detect_ms < 0.5 * self.max_latency_ms
+                      and self.level < len(self.levels) - 1
+                      and not self._known_slow(self.level + 1)):
+                    self._set_level(self.level + 1)
+
+    def _known_slow(self, level):
+        """A level measured over budget recently is not retried yet"""
+        seen = self._level_ms.get(level)
+        if seen is None:
+            return False
+        ms, at = seen
+        return ms > self.max_latency_ms and self._detections - at < self.retry_after
+
+    def _set_level(self, level):
+        # the new level costs differently; start its average afresh
+        self._level_ms[self.level] = (self.detect_ms, self._detections)
+        self.level = level
+        self.detect_ms = None
+        self.changes += 1
+        self._since_change = 0
+
+    def metrics(self):
+        with self._lock:
+            detect_ms = self.detect_ms or 0.0
+            return {
+                "scale": self.scale,
+                "upsample": self.upsample,
+                "stride": self.stride,
+                "level": self.level,
+                "detect_ms": detect_ms,
+                "frame_ms": detect_ms / self.stride,
+                "changes": self.changes,
+            }
@@ -1,17 +1,32 @@
 import os
 import sys
+import time
+import argparse
 import cv2
-import pickle
-import numpy as np
 import tkinter as tk
 from tkinter import ttk, messagebox
 from PIL import Image, ImageTk, ImageOps
-from datetime import datetime
-import face_recognition
 
+from attendance_store import AttendanceStore
+from gallery_store import GALLERY_DIR, gallery_version, load_gallery
+from gallery_watch import GalleryWatcher
+from matcher import FaceMatcher
+from pipeline import RecognitionPipeline
+from adaptive import AdaptiveController
+from detectors import build_detector
+from recognizer import HoldStill, Recognizer, draw_faces
+from sources import open_source
 
 ENCODINGS_PATH = os.path.join("encodings", "face_encodings.pkl")
 ATTENDANCE_PATH = os.path.join("attendance", "attendance.csv")
+ATTENDANCE_DB = os.path.join("attendance", "attendance.db")
+# "brute" (exact), "centroid" or "ivf" -- see gallery_index.py
+GALLERY_INDEX = "brute"
+# "hog", "haar" or "dnn" -- see detectors.py
+DETECTOR = "hog"
+# recognition targets for the adaptive controller (see adaptive.py)
+TARGET_FPS = 15.0
+MAX_LATENCY_MS = 150.0
 
 
 COLORS = {
@@ -27,38 +42,80 @@ COLORS = {
 }
 
 
+def load_matcher():
+    """Matcher over the binary gallery (or the legacy pickle); None if empty"""
+    data = load_gallery(GALLERY_DIR, ENCODINGS_PATH)
+    if data is None or len(data["names"]) == 0:
+        return None
+    return FaceMatcher.from_known_data(data, index=GALLERY_INDEX)
+
+
+def build_recognizer(matcher):
+    """Recognizer for one camera over a (shareable, read-only) matcher"""
+    return Recognizer(matcher, tracker=True,
+                      controller=AdaptiveController(TARGET_FPS, MAX_LATENCY_MS),
+                      detector=build_detector(DETECTOR))
+
+
 class AttendanceApp:
-    def __init__(self, root):
+    """
+    Pass `matcher` to reuse an already loaded gallery (the recognition
+    daemon does); otherwise the gallery is loaded here. Either way a
+    GalleryWatcher swaps in newly registered people while the window runs.
+    """
+
+    def __init__(self, root, source="0", matcher=None):
         self.root = root
+        self.source = source
         self.root.title("Smart Attendance - Real-time Recognition")
         self.root.geometry("1000x650")
         self.root.configure(bg=COLORS["app_bg"])
-        self.pending_name = None
-        self.pending_start = None
+        self.hold = HoldStill()
 
         os.makedirs("attendance", exist_ok=True)
-
-        self.known_data = self.load_encodings()
+        self.store = AttendanceStore(ATTENDANCE_DB, ATTENDANCE_PATH)
+
+        version = gallery_version(GALLERY_DIR, ENCODINGS_PATH)
+        if matcher is None:
+            matcher = load_matcher()
+            if matcher is None:
+                messagebox.showerror(
+                    "Error", "Encodings not found. Register faces first.")
+        self.recognizer = build_recognizer(matcher) if matcher is not None else None
+        self.watcher = GalleryWatcher(load_matcher, self.swap_matcher, version,
+                                      gallery_dir=GALLERY_DIR,
+                                      pickle_path=ENCODINGS_PATH)
+        self.watcher.start()
 
         self._setup_styles()
         self._build_layout()
 
         # Internal variables
-        self.cap = None
+        self.pipeline = None
         self.is_running = False
         self._video_after_id = None
+        self._rendered_frame_id = None
+        self._last_faces = []
+        self._last_metrics_update = 0.0
 
         # Clean up on close
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
-    def load_encodings(self):
-        """Load pre-trained face encodings"""
-        if not os.path.exists(ENCODINGS_PATH):
-            messagebox.showerror(
-                "Error", "Encodings not found. Register faces first.")
-            return None
-        with open(ENCODINGS_PATH, "rb") as f:
-            return pickle.load(f)
+    def swap_matcher(self, matcher):
+        """Called on the watcher thread with a freshly loaded gallery (None if emptied)"""
+        if matcher is None:
+            if self.recognizer is not None:
+                # everyone was deleted: nobody may be recognized any more
+                self.recognizer.set_matcher(
+                    FaceMatcher([], [], tolerance=self.recognizer.matcher.tolerance))
+            print("Gallery reloaded: no face encodings left")
+            return
+        if self.recognizer is None:
+            # first registration while the window was open
+            self.recognizer = build_recognizer(matcher)
+        else:
+            self.recognizer.set_matcher(matcher)
+        print(f"Gallery reloaded: {len(matcher)} face encodings")
 
     def _setup_styles(self):
         """Configure UI styles"""
@@ -115,6 +172,16 @@ class AttendanceApp:
         )
         self.status_label.pack(padx=15, pady=(0, 10), anchor="w")
 
+        self.metrics_label = ttk.Label(
+            control_card,
+            text="",
+            background=COLORS["card_bg"],
+            foreground=COLORS["muted"],
+            font=("Consolas", 8),
+            justify="left"
+        )
+        self.metrics_label.pack(padx=15, pady=(0, 10), anchor="w")
+
     def toggle_recognition(self):
         if not self.is_running:
             self.start_recognition()
@@ -122,12 +189,17 @@ class AttendanceApp:
             self.stop_recognition()
 
     def start_recognition(self):
-        if self.known_data is None:
+        if self.recognizer is None:
             return
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
+        cap = open_source(self.source)
+        if not cap.isOpened():
             messagebox.showerror("Error", "Cannot open camera.")
             return
+        self.recognizer.tracker.reset()
+        self.pipeline = RecognitionPipeline(cap, self.recognizer)
+        self.pipeline.start()
+        self._rendered_frame_id = None
+        self._last_faces = []
         self.is_running = True
         self.btn_toggle.configure(text="Stop Camera")
         self.update_video()
@@ -135,95 +207,57 @@ class AttendanceApp:
     def stop_recognition(self):
         self.is_running = False
         self.btn_toggle.configure(text="Mark Attendance")
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
         self.video_label.configure(image="")
+        self.metrics_label.configure(text="")
         if self._video_after_id:
             self.root.after_cancel(self._video_after_id)
+            self._video_after_id = None
 
     def mark_attendance_logic(self, name):
         """Check for daily duplicates and save attendance"""
-        now = datetime.now()
-        date_str = now.strftime("%Y-%m-%d")
-        time_str = now.strftime("%H:%M:%S")
-
-        if not os.path.exists(ATTENDANCE_PATH):
-            with open(ATTENDANCE_PATH, "w") as f:
-                f.write("Name,Date,Time\n")
-
-        # DAILY DUPLICATE CHECK START
-        already_marked = False
-        with open(ATTENDANCE_PATH, "r") as f:
-            lines = f.readlines()
-            for line in lines:
-
-                if name in line and date_str in line:
-                    already_marked = True
-                    break
+        marked, time_str = self.store.mark(name)
+        self.stop_recognition()
 
-        if already_marked:
-            self.stop_recognition()
+        if not marked:
             messagebox.showwarning(
                 "Already Marked", f"Attendance already marked for {name} today!")
             return
-        # DAILY DUPLICATE CHECK END
-
-        with open(ATTENDANCE_PATH, "a") as f:
-            f.write(f"{name},{date_str},{time_str}\n")
 
-        self.stop_recognition()
         messagebox.showinfo(
             "Success", f"Attendance Marked Successfully!\nName: {name}\nTime: {time_str}")
 
+    def handle_detections(self, faces):
+        """Apply the hold-still rule; returns True once attendance was marked"""
+        state, name = self.hold.update(faces)
+        if state == "ready":
+            self.mark_attendance_logic(name)
+            return True
+        if state == "pending":
+            self.status_label.config(
+                text=f"Detected {name}, Please hold still...")
+        elif state == "searching":
+            self.status_label.config(
+                text=f"Status: Searching for face...")
+        return False
+
     def update_video(self):
-        if not self.is_running or self.cap is None:
+        if not self.is_running or self.pipeline is None:
             return
 
-        ret, frame = self.cap.read()
-        if ret:
-            small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-            rgb_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-
-            face_locs = face_recognition.face_locations(rgb_small)
-            face_encs = face_recognition.face_encodings(rgb_small, face_locs)
-
-            for (top, right, bottom, left), face_enc in zip(face_locs, face_encs):
-                matches = face_recognition.compare_faces(
-                    self.known_data["encodings"], face_enc, 0.5)
-                name = "Unknown"
-
-                face_distances = face_recognition.face_distance(
-                    self.known_data["encodings"], face_enc)
-                if len(face_distances) > 0:
-                    best_match_idx = np.argmin(face_distances)
-                    if matches[best_match_idx]:
-                        name = self.known_data["names"][best_match_idx]
-
-                if name != "Unknown":
-                    now = datetime.now()
-                    if self.pending_name == name:
-                        elapsed = (now - self.pending_start).total_seconds()
-                        if elapsed >= 1.5:
-                            self.mark_attendance_logic(name)
-                            return
-                    else:
-                        self.pending_name = name
-                        self.pending_start = now
-                        self.status_label.config(
-                            text=f"Detected {name}, Please hold still...")
-                else:
-                    self.pending_name = None
-                    self.pending_start = None
-                    self.status_label.config(
-                        text=f"Status: Searching for face...")
-
-                top, right, bottom, left = top*4, right*4, bottom*4, left*4
-                color = (74, 163, 22) if name != "Unknown" else (38, 38, 220)
-                cv2.rectangle(frame, (left, top),
-                              (right, bottom), color[::-1], 2)
-                cv2.putText(frame, name, (left, top-10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, color[::-1], 2)
+        result = self.pipeline.latest_result()
+        if result is not None:
+            self._last_faces = result["result"]
+            if self.handle_detections(self._last_faces):
+                return
+
+        packet = self.pipeline.latest_frame()
+        if packet is not None and packet[0] != self._rendered_frame_id:
+            start = time.perf_counter()
+            self._rendered_frame_id, _, frame = packet
+            frame = draw_faces(frame.copy(), self._last_faces)
 
             img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
             img = ImageOps.contain(
@@ -231,16 +265,56 @@ class AttendanceApp:
             imgtk = ImageTk.PhotoImage(image=img)
             self.video_label.imgtk = imgtk
             self.video_label.configure(image=imgtk)
-
-        self._video_after_id = self.root.after(10, self.update_video)
+            self.pipeline.render_timer.add(time.perf_counter() - start)
+
+        self.update_metrics()
+        self._video_after_id = self.root.after(
+            self.poll_delay_ms(), self.update_video)
+
+    def poll_delay_ms(self):
+        """Poll at about twice the camera's frame rate instead of a fixed 10ms"""
+        fps = self.pipeline.capture_timer.snapshot()["fps"]
+        if fps <= 0:
+            return 10
+        return max(5, min(50, int(500 / fps)))
+
+    def update_metrics(self):
+        """Show queue depths and per-stage latencies, at most once a second"""
+        now = time.perf_counter()
+        if now - self._last_metrics_update < 1.0:
+            return
+        self._last_metrics_update = now
+        stats = self.pipeline.stats()
+        lines = [
+            f"{stage:<12}{stats[stage]['fps']:5.1f} fps {stats[stage]['avg_ms']:6.1f} ms"
+            for stage in ("capture", "recognition", "render")
+        ]
+        lines.append(
+            f"queue {stats['frame_queue_depth']} (dropped {stats['frame_queue_dropped']})")
+        lines.append(f"encoded {100 * self.recognizer.encode_ratio():.0f}% of faces")
+        lines.append(f"gallery {len(self.recognizer.matcher)} faces, "
+                     f"{self.watcher.reloads} reload(s)")
+        ctl = self.recognizer.controller.metrics()
+        lines.append(
+            f"detect x{ctl['scale']:.2f} up{ctl['upsample']} every {ctl['stride']} "
+            f"({ctl['detect_ms']:.0f} ms, {ctl['frame_ms']:.0f} ms/frame)")
+        self.metrics_label.configure(text="\n".join(lines))
 
     def on_close(self):
         self.stop_recognition()
+        self.watcher.stop()
+        self.store.close()
         self.root.destroy()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Real-time attendance")
+    parser.add_argument("--source", default="0",
+                        help="camera index, video file, stream URL or 'synthetic'"
+                             " (several cameras: see multicam.py)")
+    args = parser.parse_args()
+
     root = tk.Tk()
     root.state("zoomed")
-    app = AttendanceApp(root)
+    app = AttendanceApp(root, source=args.source)
     root.mainloop()
@@ -0,0 +1,635 @@
+import os
+import csv
+import io
+import time
+import sqlite3
+import argparse
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+ATTENDANCE_PATH = os.path.join("attendance", "attendance.csv")
+ATTENDANCE_DB = os.path.join("attendance", "attendance.db")
+CSV_HEADER = ["Name", "Date", "Time"]
+
+AGGREGATES_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id   INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_date_time ON records(date, time);
+CREATE INDEX IF NOT EXISTS records_name ON records(name);
+CREATE TABLE IF NOT EXISTS marked (
+    name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    PRIMARY KEY (name, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily_counts (
+    date    TEXT PRIMARY KEY,
+    records INTEGER NOT NULL,
+    people  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS person_counts (
+    name       TEXT PRIMARY KEY,
+    records    INTEGER NOT NULL,
+    days       INTEGER NOT NULL,
+    first_date TEXT,
+    last_date  TEXT
+);
+CREATE TABLE IF NOT EXISTS hourly_counts (
+    date    TEXT NOT NULL,
+    hour    INTEGER NOT NULL,
+    records INTEGER NOT NULL,
+    PRIMARY KEY (date, hour)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value
+);
+"""
+
+
+def parse_csv_lines(text):
+    """Parse attendance CSV text into [name, date, time] rows, skipping headers"""
+    rows = []
+    for row in csv.reader(io.StringIO(text)):
+        if not row or row == CSV_HEADER:
+            continue
+        row = (row + ["", "", ""])[:3]
+        rows.append(row)
+    return rows
+
+
+def read_appended(path, offset):
+    """
+    Read complete rows written after byte `offset`.
+    Returns (rows, new_offset); a trailing half-written line is left for
+    the next call.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read()
+    end = chunk.rfind(b"\n") + 1
+    return parse_csv_lines(chunk[:end].decode("utf-8", "replace")), offset + end
+
+
+def format_rows(rows):
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+
+class FileLock:
+    """
+    Exclusive lock shared by every process that writes the attendance log.
+    Uses flock on POSIX and msvcrt.locking on Windows; re-entrant within a
+    process so a caller holding it can still call append().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        self._depth += 1
+        if self._depth > 1:
+            return
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10s; keep waiting
+                    continue
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class AttendanceWriter:
+    """
+    The one place that appends to attendance.csv.
+
+    Every append holds an inter-process FileLock, writes whole rows in a
+    single O_APPEND write, and creates the file with its header atomically
+    (temp file + rename, under the lock). fsync is batched: with
+    durability_window=0 every append is synced before returning; otherwise
+    appends made within the window share one fsync, issued by a timer or by
+    flush()/close().
+    """
+
+    def __init__(self, csv_path=ATTENDANCE_PATH, durability_window=0.0):
+        self.csv_path = csv_path
+        self.durability_window = durability_window
+        self.lock = FileLock(csv_path + ".lock")
+        os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+
+        self._dirty = False
+        self._last_sync = 0.0
+        self._timer = None
+        self._timer_lock = threading.Lock()
+
+    def _ensure_header(self):
+        if not os.path.exists(self.csv_path):
+            self._write_header()
+
+    def _write_header(self):
+        """Replace the log with a header-only file (temp file + rename)"""
+        tmp_path = f"{self.csv_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(format_rows([CSV_HEADER]))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.csv_path)
+
+    def append(self, rows):
+        """Append [name, date, time] rows as one write"""
+        data = format_rows(rows)
+        with self.lock:
+            self._ensure_header()
+            fd = os.open(self.csv_path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, data)
+                self._after_write(fd)
+            finally:
+                os.close(fd)
+
+    def _after_write(self, fd):
+        now = time.monotonic()
+        if self.durability_window <= 0 or now - self._last_sync >= self.durability_window:
+            os.fsync(fd)
+            self._last_sync = now
+            self._dirty = False
+            return
+        self._dirty = True
+        with self._timer_lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.durability_window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def clear(self):
+        """Atomically replace the log with an empty one (header only)"""
+        with self.lock:
+            # readers see the old log or the empty one, never no file
+            self._write_header()
+
+    def flush(self):
+        """fsync any appends still inside the durability window"""
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not self._dirty or not os.path.exists(self.csv_path):
+            return
+        with self.lock:
+            fd = os.open(self.csv_path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._last_sync = time.monotonic()
+            self._dirty = False
+
+    def close(self):
+        self.flush()
+
+
+class AttendanceStore:
+    """
+    SQLite index over attendance/attendance.csv.
+
+    The CSV stays the log everything else reads; the database mirrors it by
+    importing whatever was appended since the last recorded byte offset.
+    `records` keeps every CSV row (lossless), `marked` has one row per
+    (name, date) and backs the duplicate check, and the names already marked
+    today are cached in memory so is_marked() is a set lookup.
+    """
+
+    def __init__(self, db_path=ATTENDANCE_DB, csv_path=ATTENDANCE_PATH,
+                 durability_window=0.0):
+        self.db_path = db_path
+        self.csv_path = csv_path
+        self.writer = AttendanceWriter(csv_path, durability_window)
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(
+            db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+        self._day = None
+        self._marked_today = set()
+        self._data_version = None
+        self._resets = 0
+        self._poll_state = None
+        if self._meta("aggregates_version") != AGGREGATES_VERSION:
+            # index built before the counters existed
+            with self._transaction():
+                self._rebuild_aggregates()
+        self.sync()
+
+    def close(self):
+        with self._lock:
+            self.writer.close()
+            self.conn.close()
+
+    # CSV mirroring
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction taken up front, so the offset read and the
+        import it guards cannot interleave with another process's sync"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _meta(self, key, default=None):
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _insert_rows(self, rows):
+        self.conn.executemany(
+            "INSERT INTO records (name, date, time) VALUES (?, ?, ?)", rows)
+
+        day_records = Counter()
+        day_people = Counter()
+        person_records = Counter()
+        person_days = Counter()
+        person_first = {}
+        person_last = {}
+        hour_records = Counter()
+        for name, date, time_str in rows:
+            day_records[date] += 1
+            person_records[name] += 1
+            if name not in person_first or date < person_first[name]:
+                person_first[name] = date
+            if name not in person_last or date > person_last[name]:
+                person_last[name] = date
+            hour = time_str[:2]
+            if hour.isdigit():
+                hour_records[(date, int(hour))] += 1
+            new_day = self.conn.execute(
+                "INSERT OR IGNORE INTO marked (name, date) VALUES (?, ?)",
+                (name, date)).rowcount
+            if new_day:
+                day_people[date] += 1
+                person_days[name] += 1
+            if date == self._day:
+                self._marked_today.add(name)
+
+        self.conn.executemany(
+            "INSERT INTO daily_counts (date, records, people) VALUES (?, ?, ?) "
+            "ON CONFLICT(date) DO UPDATE SET records = records + excluded.records, "
+            "people = people + excluded.people",
+            [(d, n, day_people[d]) for d, n in day_records.items()])
+        self.conn.executemany(
+            "INSERT INTO person_counts (name, records, days, first_date, last_date) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET "
+            "records = records + excluded.records, days = days + excluded.days, "
+            "first_date = min(first_date, excluded.first_date), "
+            "last_date = max(last_date, excluded.last_date)",
+            [(name, n, person_days[name], person_first[name], person_last[name])
+             for name, n in person_records.items()])
+        self.conn.executemany(
+            "INSERT INTO hourly_counts (date, hour, records) VALUES (?, ?, ?) "
+            "ON CONFLICT(date, hour) DO UPDATE SET records = records + excluded.records",
+            [(d, h, n) for (d, h), n in hour_records.items()])
+
+    def _rebuild_aggregates(self):
+        for table in ("daily_counts", "person_counts", "hourly_counts"):
+            self.conn.execute(f"DELETE FROM {table}")
+        self.conn.execute(
+            "INSERT INTO daily_counts (date, records, people) "
+            "SELECT date, COUNT(*), COUNT(DISTINCT name) FROM records GROUP BY date")
+        self.conn.execute(
+            "INSERT INTO person_counts (name, records, days, first_date, last_date) "
+            "SELECT name, COUNT(*), COUNT(DISTINCT date), MIN(date), MAX(date) "
+            "FROM records GROUP BY name")
+        self.conn.execute(
+            "INSERT INTO hourly_counts (date, hour, records) "
+            "SELECT date, CAST(substr(time, 1, 2) AS INTEGER), COUNT(*) FROM records "
+            "WHERE substr(time, 1, 2) GLOB '[0-9][0-9]' GROUP BY 1, 2")
+        self._set_meta("aggregates_version", AGGREGATES_VERSION)
+
+    def rebuild_aggregates(self):
+        """Recompute the daily/person/hourly counters from all records"""
+        with self._lock:
+            self.sync()
+            with self._transaction():
+                self._rebuild_aggregates()
+
+    def _reset(self):
+        self.conn.execute("DELETE FROM records")
+        self.conn.execute("DELETE FROM marked")
+        for table in ("daily_counts", "person_counts", "hourly_counts"):
+            self.conn.execute(f"DELETE FROM {table}")
+        self._set_meta("csv_offset", 0)
+        self._day = None
+        self._resets += 1
+
+    def sync(self):
+        """
+        Import rows appended to the CSV since the last sync. A truncated or
+        replaced file (size below the offset, or a new inode) is re-imported
+        from scratch. Returns the number of rows imported.
+        """
+        with self._lock:
+            if not os.path.exists(self.csv_path):
+                return 0
+            with self._transaction():
+                st = os.stat(self.csv_path)
+                offset = self._meta("csv_offset", 0)
+                if st.st_size < offset or self._meta("csv_inode") not in (None, st.st_ino):
+                    self._reset()
+                    offset = 0
+                if st.st_size == offset:
+                    return 0
+
+                rows, new_offset = read_appended(self.csv_path, offset)
+                self._insert_rows(rows)
+                self._set_meta("csv_offset", new_offset)
+                self._set_meta("csv_inode", st.st_ino)
+            return len(rows)
+
+    def clear(self):
+        """Empty the attendance log and the index"""
+        with self._lock, self.writer.lock:
+            self.writer.clear()
+            self.sync()
+
+    def reimport(self):
+        """Drop the index and rebuild it from the whole CSV"""
+        with self._lock:
+            with self._transaction():
+                self._reset()
+            return self.sync()
+
+    # Queries
+
+    def _load_day(self, date_str):
+        # data_version moves when another connection commits, e.g. a second
+        # process that imported rows this one has not seen
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._day != date_str or self._data_version != version:
+            self._marked_today = {
+                name for (name,) in self.conn.execute(
+                    "SELECT name FROM marked WHERE date = ?", (date_str,))
+            }
+            self._day = date_str
+            self._data_version = version
+
+    def is_marked(self, name, date_str):
+        with self._lock:
+            self._load_day(date_str)
+            return name in self._marked_today
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def day_count(self, date_str):
+        """Attendance rows logged on a day, from the daily counter"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT records FROM daily_counts WHERE date = ?", (date_str,)).fetchone()
+            return row[0] if row else 0
+
+    def day_summary(self, date_str):
+        """{'records', 'people', 'hours': {hour: records}} for one day"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT records, people FROM daily_counts WHERE date = ?",
+                (date_str,)).fetchone()
+            hours = dict(self.conn.execute(
+                "SELECT hour, records FROM hourly_counts WHERE date = ?",
+                (date_str,)))
+        records, people = row if row else (0, 0)
+        return {"records": records, "people": people, "hours": hours}
+
+    def person_summary(self, name):
+        """{'records', 'days', 'first_date', 'last_date'} for one person, or None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT records, days, first_date, last_date FROM person_counts "
+                "WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("records", "days", "first_date", "last_date"), row))
+
+    def totals(self):
+        """(records, distinct people, days) over the whole log"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT (SELECT COALESCE(SUM(records), 0) FROM daily_counts), "
+                "(SELECT COUNT(*) FROM person_counts), "
+                "(SELECT COUNT(*) FROM daily_counts)").fetchone()
+
+    def poll(self):
+        """
+        Sync from the CSV and report whether the indexed data changed since
+        the previous poll(), including rows committed by other processes.
+        """
+        with self._lock:
+            imported = self.sync()
+            version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            state = (version, self._resets)
+            changed = imported > 0 or state != self._poll_state
+            self._poll_state = state
+            return changed
+
+    @staticmethod
+    def _where(date=None, name_like=None, date_from=None, date_to=None, name=None):
+        clauses, params = [], []
+        if date:
+            clauses.append("date = ?")
+            params.append(date)
+        if date_from:
+            clauses.append("date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("date <= ?")
+            params.append(date_to)
+        if name:
+            clauses.append("name = ?")
+            params.append(name)
+        if name_like:
+            clauses.append("name LIKE ? ESCAPE '\\'")
+            escaped = name_like.replace("\\", "\\\\").replace(
+                "%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def count_rows(self, date=None, name_like=None, **filters):
+        where, params = self._where(date, name_like, **filters)
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT COUNT(*) FROM records{where}", params).fetchone()[0]
+
+    def query(self, date=None, name_like=None, order_by=("id",),
+              descending=False, offset=0, limit=-1):
+        """
+        Return [name, date, time] rows matching the filters. `order_by`
+        is a tuple of column names (trusted, see AttendanceQuery).
+        """
+        where, params = self._where(date, name_like)
+        direction = " DESC" if descending else ""
+        order = ", ".join(col + direction for col in order_by)
+        if "id" not in order_by:
+            order += ", id" + direction
+        sql = (f"SELECT name, date, time FROM records{where} "
+               f"ORDER BY {order} LIMIT ? OFFSET ?")
+        with self._lock:
+            return [list(row) for row in
+                    self.conn.execute(sql, params + [limit, offset])]
+
+    def iter_chunks(self, chunk_size=5000, **filters):
+        """
+        Yield lists of [name, date, time] rows in log order, `chunk_size` at
+        a time. Pages by id (keyset) so late chunks cost the same as early
+        ones; filters are date_from/date_to/name as in count_rows().
+        """
+        where, params = self._where(**filters)
+        where += " AND id > ?" if where else " WHERE id > ?"
+        sql = (f"SELECT id, name, date, time FROM records{where} "
+               f"ORDER BY id LIMIT ?")
+        last_id = 0
+        while True:
+            with self._lock:
+                batch = self.conn.execute(
+                    sql, params + [last_id, chunk_size]).fetchall()
+            if not batch:
+                return
+            last_id = batch[-1][0]
+            yield [list(row[1:]) for row in batch]
+
+    def names(self):
+        with self._lock:
+            return [name for (name,) in self.conn.execute(
+                "SELECT DISTINCT name FROM records ORDER BY name")]
+
+    # Writing
+
+    def mark(self, name, now=None):
+        """
+        Record attendance for `name` unless already marked today.
+        Returns (marked, time_str). The check and the append happen under
+        the writer's file lock, so concurrent processes cannot both mark
+        the same person.
+        """
+        now = now or datetime.now()
+        date_str = now.strftime("%Y-%m-%d")
+        time_str = now.strftime("%H:%M:%S")
+
+        with self._lock, self.writer.lock:
+            self.sync()
+            if self.is_marked(name, date_str):
+                return False, time_str
+            self.writer.append([[name, date_str, time_str]])
+            self.sync()
+            return True, time_str
+
+
+class AttendanceQuery:
+    """
+    Paged, sortable view over an AttendanceStore for list widgets: holds
+    the current filters and sort order, and serves count()/fetch() pages.
+    """
+
+    SORT_COLUMNS = {
+        "Name": ("name",),
+        "Date": ("date", "time"),
+        "Time": ("time",),
+    }
+
+    def __init__(self, store):
+        self.store = store
+        self.date = None
+        self.name_like = ""
+        self.sort_by = None
+        self.descending = False
+
+    def set_sort(self, column):
+        """Sort by a display column; clicking the same column flips order"""
+        if column == self.sort_by:
+            self.descending = not self.descending
+        else:
+            self.sort_by = column
+            self.descending = False
+
+    def count(self):
+        return self.store.count_rows(self.date, self.name_like)
+
+    def fetch(self, offset, limit):
+        order_by = self.SORT_COLUMNS.get(self.sort_by, ("id",))
+        return self.store.query(self.date, self.name_like, order_by,
+                                self.descending, offset, limit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the attendance index from attendance/attendance.csv")
+    parser.add_argument("--csv", default=ATTENDANCE_PATH)
+    parser.add_argument("--db", default=ATTENDANCE_DB)
+    parser.add_argument("--reimport", action="store_true",
+                        help="drop the index and import the whole CSV again")
+    parser.add_argument("--rebuild-aggregates", action="store_true",
+                        help="recompute the daily/person/hourly counters")
+    args = parser.parse_args()
+
+    store = AttendanceStore(args.db, args.csv)
+    imported = store.reimport() if args.reimport else store.sync()
+    print(f"Imported {imported} row(s); index holds {store.count()}.")
+    if args.rebuild_aggregates:
+        store.rebuild_aggregates()
+        records, people, days = store.totals()
+        print(f"Aggregates rebuilt: {records} record(s), {people} people, "
+              f"{days} day(s).")
+    store.close()
@@ -0,0 +1,85 @@
+"""
+Throughput / recall of the face detector backends on a local image set.
+
+    python benchmarks/bench_detectors.py --images dataset/faces --scale 0.25
+
+Every image under --images is expected to hold exactly one face, which is
+true of the register_face.py captures. Recall is the share of images where
+the detector found a face; "multi" counts images with more than one box
+(false positives, or a second person in shot). Images are loaded and scaled
+once up front, so the timings cover detection only. Backends whose model
+files are missing are skipped.
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detectors import DETECTORS, build_detector  # noqa: E402
+from dataset_index import DATASET_DIR, IMAGE_EXTS  # noqa: E402
+
+
+def load_images(root, scale, limit):
+    images = []
+    for dirpath, _, files in sorted(os.walk(root)):
+        for fname in sorted(files):
+            if not fname.lower().endswith(IMAGE_EXTS):
+                continue
+            bgr = cv2.imread(os.path.join(dirpath, fname))
+            if bgr is None:
+                continue
+            if scale != 1.0:
+                bgr = cv2.resize(bgr, (0, 0), fx=scale, fy=scale)
+            images.append(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+            if limit and len(images) >= limit:
+                return images
+    return images
+
+
+def run(detector, images, upsample):
+    found = multi = 0
+    start = time.perf_counter()
+    for rgb in images:
+        boxes = detector.detect(rgb, upsample)
+        found += bool(boxes)
+        multi += len(boxes) > 1
+    return time.perf_counter() - start, found, multi
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Face detector benchmark")
+    parser.add_argument("--images", default=DATASET_DIR)
+    parser.add_argument("--scale", type=float, default=0.25,
+                        help="downscale applied before detection, as in app.py")
+    parser.add_argument("--upsample", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=0,
+                        help="use at most this many images (0 = all)")
+    parser.add_argument("--detectors", nargs="+", default=list(DETECTORS))
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.scale, args.limit)
+    if not images:
+        parser.error(f"no images under {args.images}")
+    h, w = images[0].shape[:2]
+    print(f"{len(images)} images, first is {w}x{h}")
+
+    print(f"{'detector':<10}{'img/s':>9}{'ms/img':>9}{'recall':>9}{'multi':>7}")
+    for kind in args.detectors:
+        try:
+            detector = build_detector(kind)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"{kind:<10}skipped: {e}")
+            continue
+        run(detector, images[:3], args.upsample)  # warm-up
+        elapsed, found, multi = run(detector, images, args.upsample)
+        print(f"{kind:<10}{len(images) / elapsed:>9.1f}"
+              f"{1000 * elapsed / len(images):>9.1f}"
+              f"{found / len(images):>9.3f}{multi:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Match time and accuracy of a raw vs. compacted gallery.
+
+    python benchmarks/bench_gallery_compaction.py --people 100 1000 --captures 15
+
+Synthetic identities get a few "pose" modes with near-duplicate captures
+around each, like a registration burst. Distances are scaled to dlib's
+range: the same person sits around 0.35 apart, different people around
+0.9. Held-out queries are fresh samples of enrolled people (should
+match) and of unenrolled people (should come back Unknown). Reported:
+gallery rows, mean ms per query batch, accuracy on enrolled queries,
+false accepts on unenrolled ones and the mean distance of genuine
+matches (lower = more margin under the tolerance).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gallery_compact import compact_gallery  # noqa: E402
+from matcher import FaceMatcher  # noqa: E402
+
+
+def make_person(rng, captures, poses=3):
+    centre = rng.normal(0.0, 0.055, 128)
+    modes = centre + rng.normal(0.0, 0.02, (poses, 128))
+    picks = rng.integers(0, poses, captures)
+    return modes, modes[picks] + rng.normal(0.0, 0.01, (captures, 128))
+
+
+def sample(modes, count, rng):
+    picks = rng.integers(0, len(modes), count)
+    return modes[picks] + rng.normal(0.0, 0.022, (count, 128))
+
+
+def evaluate(matcher, queries, truth, batch):
+    start = time.perf_counter()
+    idx, dist = [], []
+    for i in range(0, len(queries), batch):
+        best_idx, best_dist = matcher.match(queries[i:i + batch])
+        idx.extend(best_idx)
+        dist.extend(best_dist)
+    per_batch_ms = 1000 * (time.perf_counter() - start) / max(1, len(queries) // batch)
+
+    names = matcher.names_for(idx, dist)
+    enrolled = [i for i, t in enumerate(truth) if t != "Unknown"]
+    strangers = [i for i, t in enumerate(truth) if t == "Unknown"]
+    accuracy = np.mean([names[i] == truth[i] for i in enrolled])
+    false_accepts = np.mean([names[i] != "Unknown" for i in strangers])
+    # how far inside the tolerance the genuine matches land
+    genuine_dist = np.mean([dist[i] for i in enrolled])
+    return per_batch_ms, accuracy, false_accepts, genuine_dist
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gallery compaction benchmark")
+    parser.add_argument("--people", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--captures", type=int, default=15)
+    parser.add_argument("--prototypes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=4,
+                        help="faces per frame")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'people':>7} {'gallery':<10} {'rows':>7} {'ms/frame':>9} "
+          f"{'accuracy':>9} {'false acc':>10} {'match dist':>11}")
+    for people in args.people:
+        encodings, names, modes = [], [], []
+        for p in range(people):
+            person_modes, caps = make_person(rng, args.captures)
+            modes.append(person_modes)
+            encodings.extend(caps)
+            names.extend([f"person_{p}"] * len(caps))
+        raw = {"encodings": np.array(encodings), "names": names}
+
+        queries, truth = [], []
+        for _ in range(args.queries):
+            if rng.random() < 0.8:
+                p = int(rng.integers(0, people))
+                queries.append(sample(modes[p], 1, rng)[0])
+                truth.append(f"person_{p}")
+            else:
+                stranger, _ = make_person(rng, 1)
+                queries.append(sample(stranger, 1, rng)[0])
+                truth.append("Unknown")
+        queries = np.array(queries)
+
+        galleries = [("raw", raw)] + [
+            (f"proto={k}", compact_gallery(raw, k)) for k in args.prototypes]
+        for label, data in galleries:
+            matcher = FaceMatcher(data["encodings"], data["names"])
+            ms, accuracy, false_accepts, genuine = evaluate(
+                matcher, queries, truth, args.batch)
+            print(f"{people:>7} {label:<10} {len(data['names']):>7} {ms:>9.3f} "
+                  f"{accuracy:>9.3f} {false_accepts:>10.3f} {genuine:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Recall / latency of the gallery indexes on synthetic 128-d encodings.
+
+    python benchmarks/bench_gallery_index.py --sizes 1000 10000 100000
+
+Each synthetic identity is a random centre with a few noisy "captures"
+around it, roughly like the galleries register_face.py produces. Recall is
+the fraction of queries whose best row matches the exact brute-force answer.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gallery_index import BruteForceIndex, build_index  # noqa: E402
+
+
+def make_gallery(size, per_person, rng):
+    people = max(1, size // per_person)
+    centres = rng.normal(0.0, 0.09, (people, 128))
+    labels = np.repeat(np.arange(people), per_person)[:size]
+    matrix = centres[labels] + rng.normal(0.0, 0.02, (len(labels), 128))
+    return matrix, labels, centres
+
+
+def make_queries(centres, count, rng):
+    picks = rng.integers(0, len(centres), count)
+    return centres[picks] + rng.normal(0.0, 0.03, (count, 128))
+
+
+def time_search(index, queries, batch):
+    start = time.perf_counter()
+    results = [index.search(queries[i:i + batch])
+               for i in range(0, len(queries), batch)]
+    elapsed = time.perf_counter() - start
+    return np.concatenate(results), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=4,
+                        help="faces per frame")
+    parser.add_argument("--per-person", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    configs = [
+        ("brute", {}),
+        ("centroid", {"n_probe": 3}),
+        ("ivf", {"n_probe": 4}),
+        ("ivf", {"n_probe": 16}),
+    ]
+
+    print(f"{'size':>8} {'index':<22} {'build s':>8} {'ms/frame':>9} {'recall':>7}")
+    for size in args.sizes:
+        matrix, labels, centres = make_gallery(size, args.per_person, rng)
+        queries = make_queries(centres, args.queries, rng)
+        exact, _ = time_search(BruteForceIndex(matrix), queries, args.batch)
+        frames = -(-len(queries) // args.batch)
+
+        for kind, kwargs in configs:
+            start = time.perf_counter()
+            index = build_index(kind, matrix, labels, **kwargs)
+            build_s = time.perf_counter() - start
+            found, elapsed = time_search(index, queries, args.batch)
+            recall = float(np.mean(found == exact))
+            label = kind + "".join(f" {k}={v}" for k, v in kwargs.items())
+            print(f"{size:>8} {label:<22} {build_s:>8.2f} "
+                  f"{1000 * elapsed / frames:>9.3f} {recall:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Time the attendance PDF export at growing log sizes.
+
+    python benchmarks/bench_pdf_export.py --sizes 10000 100000 1000000
+
+For each size a synthetic attendance.csv is written, indexed into SQLite
+and exported in full and for a one-month / one-person slice. Reported:
+index time, export time, rows/s and peak traced Python memory.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_store import AttendanceStore, AttendanceWriter  # noqa: E402
+from report_export import write_attendance_pdf  # noqa: E402
+
+
+def make_log(csv_path, size, people=500, batch=50000):
+    """Write `size` rows, `people` per day from 2020-01-01; returns (first, last) day"""
+    writer = AttendanceWriter(csv_path)
+    start = date(2020, 1, 1)
+    rows = []
+    for i in range(size):
+        day = start + timedelta(days=i // people)
+        rows.append([f"person_{i % people:04d}", day.isoformat(), "09:00:00"])
+        if len(rows) == batch:
+            writer.append(rows)
+            rows = []
+    if rows:
+        writer.append(rows)
+    return start, start + timedelta(days=max(size - 1, 0) // people)
+
+
+def month_slice(first, last):
+    """The calendar month around the middle of the logged days"""
+    middle = first + (last - first) / 2
+    month_start = middle.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return {"date_from": month_start.isoformat(), "date_to": month_end.isoformat()}
+
+
+def run_export(store, out_path, **filters):
+    total = store.count_rows(**filters)
+    tracemalloc.start()
+    start = time.perf_counter()
+    written = write_attendance_pdf(
+        out_path, store.iter_chunks(5000, **filters), total)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return written, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF export benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'slice':<12} {'index s':>8} {'export s':>9} "
+          f"{'rows/s':>8} {'peak MB':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "attendance.csv")
+            first, last = make_log(csv_path, size)
+
+            start = time.perf_counter()
+            store = AttendanceStore(os.path.join(tmp, "attendance.db"), csv_path)
+            index_s = time.perf_counter() - start
+
+            slices = [
+                ("all", {}),
+                ("month", month_slice(first, last)),
+                ("person", {"name": "person_0007"}),
+            ]
+            for label, filters in slices:
+                written, elapsed, peak = run_export(
+                    store, os.path.join(tmp, f"{label}.pdf"), **filters)
+                print(f"{size:>9} {label:<12} {index_s:>8.2f} {elapsed:>9.2f} "
+                      f"{written / max(elapsed, 1e-9):>8.0f} {peak / 2**20:>8.1f}")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
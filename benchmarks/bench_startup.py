@@ -0,0 +1,74 @@
+"""
+Cold vs warm launch cost of the recognition window.
+
+    python benchmarks/bench_startup.py --runs 5
+
+"cold" starts a fresh interpreter that does what app.py does before its
+window opens: import cv2 / face_recognition (dlib models), read the gallery
+and build the recognizer. "warm" asks a running recognition daemon for the
+same, which only re-reads the gallery when it changed. "dashboard" is a
+fresh interpreter importing dashboard.py, whose heavy imports are lazy.
+Run from anywhere; paths are resolved against the repository root.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from recognition_daemon import DaemonClient  # noqa: E402
+
+
+COLD_LAUNCH = ("import app; m = app.load_matcher(); "
+               "m is None or app.build_recognizer(m)")
+
+
+def time_process(code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def summary(label, seconds):
+    seconds = sorted(seconds)
+    print(f"{label:<10}{1000 * seconds[len(seconds) // 2]:>10.1f}"
+          f"{1000 * seconds[0]:>10.1f}{1000 * seconds[-1]:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    os.chdir(ROOT)
+
+    cold = [time_process(COLD_LAUNCH) for _ in range(args.runs)]
+    dashboard = [time_process("import dashboard") for _ in range(args.runs)]
+
+    client = DaemonClient()
+    started = client.start(gui=False)
+    try:
+        reply = client.request({"cmd": "warm"}, timeout=120.0)
+        if reply is None or not reply.get("ok"):
+            sys.exit(f"daemon did not come up: {reply}")
+        print(f"daemon ready, gallery of {reply['faces']} face(s) "
+              f"loaded in {reply['load_ms']:.1f} ms")
+        warm = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            client.request({"cmd": "warm"})
+            warm.append(time.perf_counter() - start)
+    finally:
+        if started:
+            client.stop()
+
+    print(f"{'launch':<10}{'median ms':>10}{'min ms':>10}{'max ms':>10}")
+    summary("cold", cold)
+    summary("warm", warm)
+    summary("dashboard", dashboard)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Hammer attendance.csv from many processes and check nothing was lost,
+duplicated or torn.
+
+    python benchmarks/stress_attendance_writer.py --procs 16 --rows 200
+
+Each process appends its own uniquely named rows through AttendanceWriter
+and also races the others to mark the same shared names through
+AttendanceStore.mark(). Afterwards the log must contain exactly one header,
+every unique row exactly once and each shared name exactly once, and the
+SQLite index must agree with the log.
+Exits non-zero on any violation.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from multiprocessing import Process
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_store import (  # noqa: E402
+    CSV_HEADER, AttendanceStore, AttendanceWriter, parse_csv_lines)
+
+DATE = "2026-01-01"
+NOW = datetime(2026, 1, 1, 9, 0, 0)
+
+
+def worker(proc_id, csv_path, db_path, rows, shared, window):
+    writer = AttendanceWriter(csv_path, durability_window=window)
+    store = AttendanceStore(db_path, csv_path, durability_window=window)
+    for i in range(rows):
+        writer.append([[f"p{proc_id}-{i}", DATE, "09:00:00"]])
+        if i < shared:
+            store.mark(f"shared-{i}", NOW)
+    writer.close()
+    store.close()
+
+
+def run(procs, rows, shared, window):
+    """Run the writers in a scratch directory; returns (errors, rows, seconds)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "attendance.csv")
+        db_path = os.path.join(tmp, "attendance.db")
+        start = time.perf_counter()
+        workers = [Process(target=worker, args=(p, csv_path, db_path, rows,
+                                                shared, window))
+                   for p in range(procs)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        with open(csv_path, "rb") as f:
+            raw = f.read().decode("utf-8")
+        store = AttendanceStore(db_path, csv_path)
+        indexed = store.count()
+        store.close()
+
+    errors = []
+    if any(p.exitcode != 0 for p in workers):
+        errors.append("a writer process crashed")
+    lines = raw.split("\n")
+    if lines[0] != ",".join(CSV_HEADER):
+        errors.append(f"first line is {lines[0]!r}, not the header")
+    if raw.count(",".join(CSV_HEADER)) != 1:
+        errors.append("header written more than once")
+    if not raw.endswith("\n"):
+        errors.append("log does not end with a complete row")
+    torn = [line for line in lines[1:] if line and line.count(",") != 2]
+    if torn:
+        errors.append(f"{len(torn)} torn line(s), e.g. {torn[0]!r}")
+
+    counts = Counter(row[0] for row in parse_csv_lines(raw))
+    expected = {f"p{p}-{i}" for p in range(procs) for i in range(rows)}
+    expected |= {f"shared-{i}" for i in range(min(shared, rows))}
+    missing = expected - set(counts)
+    dupes = [name for name, n in counts.items() if n > 1]
+    extra = set(counts) - expected
+    if missing:
+        errors.append(f"{len(missing)} row(s) lost")
+    if dupes:
+        errors.append(f"{len(dupes)} duplicated row(s), e.g. {dupes[0]}")
+    if extra:
+        errors.append(f"{len(extra)} unexpected row(s)")
+
+    total = sum(counts.values())
+    if indexed != total:
+        errors.append(f"index holds {indexed} rows, log has {total}")
+    return errors, total, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="attendance writer stress test")
+    parser.add_argument("--procs", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--shared", type=int, default=20,
+                        help="names every process tries to mark")
+    parser.add_argument("--window", type=float, default=0.05,
+                        help="fsync durability window in seconds")
+    args = parser.parse_args()
+
+    errors, total, elapsed = run(args.procs, args.rows, args.shared, args.window)
+    print(f"{args.procs} processes wrote {total} rows in {elapsed:.2f}s "
+          f"({total / elapsed:.0f} rows/s)")
+    if errors:
+        for e in errors:
+            print(f"FAIL: {e}")
+        sys.exit(1)
+    print("OK: no lost, duplicated or torn rows")
+
+
+if __name__ == "__main__":
+    main()
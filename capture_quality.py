@@ -0,0 +1,211 @@
+"""
+Quality-gated auto-capture for registration.
+
+Live preview frames are scored on a background thread and only the best,
+mutually different N are kept, so the dataset gets fewer, better images:
+
+  1. exactly one face, at least `min_face_size` pixels tall
+  2. sharp enough (variance of the Laplacian over the face crop)
+  3. well exposed (mean brightness of the face crop inside a range)
+  4. then encoded, and compared with what is already selected: a frame
+     close to a selected one (same pose and lighting) can only replace it
+     by scoring higher; a different one replaces the weakest selection.
+
+Head yaw from the 5-point landmarks adds a bonus for under-represented
+poses (left / frontal / right), so the set covers several angles.
+"""
+import math
+import threading
+
+import cv2
+import numpy as np
+import face_recognition
+
+from detectors import HogDetector
+from pipeline import LatestQueue
+
+
+AUTO_CAPTURE_COUNT = 10
+MIN_SHARPNESS = 80.0
+BRIGHTNESS_RANGE = (60.0, 200.0)
+MIN_FACE_SIZE = 80
+MIN_DISTANCE = 0.12       # encodings closer than this count as the same shot
+PATIENCE = 40             # scored frames without an improvement before done
+POSE_BINS = ("left", "frontal", "right")
+
+
+def face_crop_stats(gray, box):
+    """(sharpness, brightness) of the face region of a grey frame"""
+    top, right, bottom, left = box
+    crop = gray[max(0, top):bottom, max(0, left):right]
+    if crop.size == 0:
+        return 0.0, 0.0
+    sharpness = float(cv2.Laplacian(crop, cv2.CV_64F).var())
+    return sharpness, float(crop.mean())
+
+
+def pose_bin(landmarks):
+    """Coarse head yaw from the 5-point landmarks: nose offset from the eye midpoint"""
+    left_eye = np.mean(landmarks["left_eye"], axis=0)
+    right_eye = np.mean(landmarks["right_eye"], axis=0)
+    nose = np.mean(landmarks["nose_tip"], axis=0)
+    eye_dist = max(np.linalg.norm(right_eye - left_eye), 1.0)
+    yaw = (nose[0] - (left_eye[0] + right_eye[0]) / 2) / eye_dist
+    if yaw < -0.15:
+        return "left"
+    if yaw > 0.15:
+        return "right"
+    return "frontal"
+
+
+class AutoCapture:
+    """
+    Scores frames handed to offer() on a worker thread and keeps the best
+    `target` diverse ones. selected() returns their frames; `finished` is
+    set once the selection is full and `patience` further frames brought
+    no improvement. `rejected` counts frames per failed gate.
+    """
+
+    def __init__(self, target=AUTO_CAPTURE_COUNT, detector=None, scale=0.5,
+                 min_sharpness=MIN_SHARPNESS, brightness_range=BRIGHTNESS_RANGE,
+                 min_face_size=MIN_FACE_SIZE, min_distance=MIN_DISTANCE,
+                 patience=PATIENCE):
+        self.target = target
+        self.detector = detector or HogDetector(upsample=0)
+        self.scale = scale
+        self.min_sharpness = min_sharpness
+        self.brightness_range = brightness_range
+        self.min_face_size = min_face_size
+        self.min_distance = min_distance
+        self.patience = patience
+
+        self.scored = 0
+        self.rejected = {}
+        self.finished = False
+        self._since_improved = 0
+        self._selection = []     # dicts: frame, encoding, quality, pose
+        self._lock = threading.Lock()
+        self._queue = LatestQueue(1)
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Lifecycle
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="auto-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+
+    def offer(self, frame):
+        """Hand over a preview frame; never blocks, stale frames are dropped"""
+        if not self.finished:
+            self._queue.put(frame)
+
+    def _run(self):
+        while not self._stop.is_set() and not self.finished:
+            frame = self._queue.get(timeout=0.1)
+            if frame is not None:
+                try:
+                    self.consider(frame)
+                except Exception as e:
+                    print(f"Auto-capture error: {e}")
+
+    # Scoring
+
+    def _reject(self, reason):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return False, reason
+
+    def consider(self, frame):
+        """Score one BGR frame; returns (kept, reason)"""
+        self.scored += 1
+        self._since_improved += 1
+        kept, reason = self._consider(frame)
+        if kept:
+            self._since_improved = 0
+        with self._lock:
+            full = len(self._selection) >= self.target
+        if full and self._since_improved >= self.patience:
+            self.finished = True
+        return kept, reason
+
+    def _consider(self, frame):
+        small = cv2.resize(frame, (0, 0), fx=self.scale, fy=self.scale)
+        rgb_small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        boxes = self.detector.detect(rgb_small)
+        if len(boxes) != 1:
+            return self._reject("no face" if not boxes else "several faces")
+
+        up = 1.0 / self.scale
+        box = tuple(int(v * up) for v in boxes[0])
+        if box[2] - box[0] < self.min_face_size:
+            return self._reject("too far")
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        sharpness, brightness = face_crop_stats(gray, box)
+        if sharpness < self.min_sharpness:
+            return self._reject("blurry")
+        low, high = self.brightness_range
+        if not low <= brightness <= high:
+            return self._reject("too dark" if brightness < low else "too bright")
+
+        landmarks = face_recognition.face_landmarks(
+            rgb_small, [boxes[0]], model="small")
+        pose = pose_bin(landmarks[0]) if landmarks else "frontal"
+        encoding = face_recognition.face_encodings(rgb_small, [boxes[0]])[0]
+
+        # sharper and closer to mid-grey is better
+        quality = math.log(sharpness) - abs(brightness - 128.0) / 64.0
+        return self._select({
+            "frame": frame, "encoding": encoding, "quality": quality, "pose": pose})
+
+    def _select(self, cand):
+        with self._lock:
+            sel = self._selection
+            poses = [s["pose"] for s in sel]
+            # bonus for a pose the selection is short of
+            if poses.count(cand["pose"]) < max(1, self.target // len(POSE_BINS)):
+                cand["quality"] += 0.5
+
+            if sel:
+                dists = np.linalg.norm(
+                    np.array([s["encoding"] for s in sel]) - cand["encoding"], axis=1)
+                nearest = int(np.argmin(dists))
+                if dists[nearest] < self.min_distance:
+                    # same shot as one we have: keep the better of the two
+                    if cand["quality"] > sel[nearest]["quality"]:
+                        sel[nearest] = cand
+                        return True, "replaced similar"
+                    return self._reject("similar")
+
+            if len(sel) < self.target:
+                sel.append(cand)
+                return True, "added"
+            weakest = min(range(len(sel)), key=lambda i: sel[i]["quality"])
+            if cand["quality"] > sel[weakest]["quality"]:
+                sel[weakest] = cand
+                return True, "replaced weakest"
+            return self._reject("lower quality")
+
+    # Results
+
+    def count(self):
+        with self._lock:
+            return len(self._selection)
+
+    def selected(self):
+        """Frames of the current selection, best first"""
+        with self._lock:
+            ranked = sorted(self._selection, key=lambda s: -s["quality"])
+        return [s["frame"] for s in ranked]
+
+    def poses(self):
+        with self._lock:
+            return {p: sum(s["pose"] == p for s in self._selection) for p in POSE_BINS}
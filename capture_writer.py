@@ -0,0 +1,135 @@
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from pipeline import StageTimer
+
+
+IMAGE_FORMATS = ("jpg", "png")
+DEFAULT_JPEG_QUALITY = 95
+DEFAULT_PNG_COMPRESSION = 3
+MAX_PENDING = 8
+
+
+def next_free_index(folder, prefix="img_"):
+    """One past the highest '<prefix><n>.*' number in folder (0 if none)"""
+    taken = [-1]
+    if os.path.isdir(folder):
+        for fname in os.listdir(folder):
+            stem = fname.split(".", 1)[0]
+            if stem.startswith(prefix) and stem[len(prefix):].isdigit():
+                taken.append(int(stem[len(prefix):]))
+    return max(taken) + 1
+
+
+class CaptureWriter:
+    """
+    Writes captured frames to disk on a background thread.
+
+    submit() only queues the frame, so the Tk preview loop never waits on
+    JPEG/PNG encoding or the disk. The queue is bounded (`max_pending`):
+    when the disk falls behind submit() returns None instead of queueing
+    more, and the caller decides whether to retry or tell the user. Files
+    are written to a temporary name and renamed, so the encoder never picks
+    up a half-written image. `on_written(path)` is called from the writer
+    thread after each file lands (the registration GUI records it in the
+    dataset index).
+    """
+
+    def __init__(self, fmt="jpg", jpeg_quality=DEFAULT_JPEG_QUALITY,
+                 png_compression=DEFAULT_PNG_COMPRESSION, max_pending=MAX_PENDING,
+                 on_written=None):
+        if fmt not in IMAGE_FORMATS:
+            raise ValueError(
+                f"Unknown image format '{fmt}' (choose from {', '.join(IMAGE_FORMATS)})")
+        self.fmt = fmt
+        self.on_written = on_written
+        if fmt == "jpg":
+            self.params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+        else:
+            self.params = [cv2.IMWRITE_PNG_COMPRESSION, int(png_compression)]
+
+        self.written = 0
+        self.failed = 0
+        self.rejected = 0
+        self.last_error = None
+        self.write_timer = StageTimer()
+        self._next_index = {}
+
+        self._queue = queue.Queue(max(1, max_pending))
+        self._thread = threading.Thread(
+            target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+
+    def next_path(self, folder, prefix="img_"):
+        """
+        Next free '<prefix><n>.<fmt>' in folder. Numbers continue after the
+        files already there (re-registering a user adds images instead of
+        overwriting them) and after paths handed out but not yet written.
+        """
+        key = (folder, prefix)
+        if key not in self._next_index:
+            self._next_index[key] = next_free_index(folder, prefix)
+        n = self._next_index[key]
+        self._next_index[key] = n + 1
+        return os.path.join(folder, f"{prefix}{n}.{self.fmt}")
+
+    def submit(self, frame, folder, prefix="img_"):
+        """
+        Queue `frame` as the next image in `folder`. Returns its path, or
+        None (nothing queued, no number used) if the writer is backed up.
+        Meant to be called from one thread, the GUI's.
+        """
+        if self._queue.full():
+            self.rejected += 1
+            return None
+        path = self.next_path(folder, prefix)
+        self._queue.put_nowait((frame, path))
+        return path
+
+    def pending(self):
+        return self._queue.unfinished_tasks
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is on disk; False on timeout"""
+        if timeout is None:
+            self._queue.join()
+            return True
+        # Queue.join() has no timeout; wait on the condition it uses
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(
+                lambda: not self._queue.unfinished_tasks, timeout)
+
+    def close(self, timeout=5.0):
+        self.flush(timeout)
+        self._queue.put((None, None))
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            frame, path = self._queue.get()
+            if frame is None:
+                self._queue.task_done()
+                return
+            start = time.perf_counter()
+            try:
+                ok, buf = cv2.imencode("." + self.fmt, frame, self.params)
+                if not ok:
+                    raise IOError(f"could not encode {path}")
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(buf.tobytes())
+                os.replace(tmp_path, path)
+                self.written += 1
+                self.write_timer.add(time.perf_counter() - start)
+                if self.on_written is not None:
+                    self.on_written(path)
+            except Exception as e:
+                self.failed += 1
+                self.last_error = e
+                print(f"Capture write failed: {e}")
+            finally:
+                self._queue.task_done()
@@ -1,16 +1,25 @@
 import os
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import subprocess
-import csv
 from datetime import datetime
-from fpdf import FPDF
-from PIL import Image, ImageTk, ImageOps
 import shutil
 
+from attendance_store import AttendanceQuery, AttendanceStore
+from dataset_index import DatasetIndex
+from recognition_daemon import DaemonClient
+from virtual_table import VirtualTable
+
+# PIL and fpdf are imported where they are first needed, so the dashboard
+# window comes up without them; cv2 and face_recognition live in the
+# recognition daemon (see recognition_daemon.py).
+
 REGISTER_SCRIPT = "register_face.py"
 MARK_ATTENDANCE_SCRIPT = "app.py"
 ATTENDANCE_PATH = os.path.join("attendance", "attendance.csv")
+ATTENDANCE_DB = os.path.join("attendance", "attendance.db")
 DATASET_DIR = os.path.join("dataset", "faces")
 
 # UI COLOR PALETTE
@@ -37,6 +46,13 @@ class ReportWindow(tk.Toplevel):
         # Track current view: "all" or "today"
         self.current_mode = "all"
 
+        # Indexed copy of the log; the table pages through it
+        self.store = AttendanceStore(ATTENDANCE_DB, ATTENDANCE_PATH)
+        self.query = AttendanceQuery(self.store)
+        self._search_after_id = None
+        self._refresh_after_id = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Toolbar
         toolbar = tk.Frame(self, bg=COLORS["card"], pady=10)
         toolbar.pack(fill="x")
@@ -74,52 +90,56 @@ class ReportWindow(tk.Toplevel):
             font=("Segoe UI", 9, "bold")
         ).pack(side="right", padx=20)
 
-        # Treeview
+        # Name search
+        self.search_var = tk.StringVar()
+        search = ttk.Entry(toolbar, textvariable=self.search_var, width=24)
+        search.pack(side="right")
+        tk.Label(toolbar, text="🔍 Name", bg=COLORS["card"],
+                 fg=COLORS["text"]).pack(side="right", padx=(0, 6))
+        self.search_var.trace_add("write", self.on_search)
+
+        # Summary line, read from the precomputed counters
+        self.summary_label = tk.Label(
+            self, text="", anchor="w", bg=COLORS["bg"], fg="#64748B",
+            font=("Segoe UI", 10))
+        self.summary_label.pack(fill="x", padx=20, pady=(10, 0))
+
+        # Table (virtualized: only the visible rows are materialized)
         style = ttk.Style()
         style.configure("Treeview", rowheight=30)
 
-        self.tree = ttk.Treeview(
+        self.table = VirtualTable(
             self,
+            self.query,
             columns=("Name", "Date", "Time"),
-            show="headings"
+            headings={"Name": "Student Name",
+                      "Date": "Date", "Time": "Check-in Time"},
+            bg=COLORS["bg"]
         )
-        self.tree.heading("Name", text="Student Name")
-        self.tree.heading("Date", text="Date")
-        self.tree.heading("Time", text="Check-in Time")
-        self.tree.pack(fill="both", expand=True, padx=20, pady=20)
+        self.table.pack(fill="both", expand=True, padx=20, pady=20)
 
         #  auto-refresh
         self.load_all()
-        self.after(2000, self.auto_refresh)   # refresh every 2 seconds
+        self._refresh_after_id = self.after(
+            2000, self.auto_refresh)   # refresh every 2 seconds
 
     # Data helpers
 
-    def get_data(self):
-
-        rows = []
-        if not os.path.exists(ATTENDANCE_PATH):
-            return rows
-
-        with open(ATTENDANCE_PATH, "r", newline="") as f:
-            reader = csv.reader(f)
-            header = next(reader, None)
-            for row in reader:
-                if len(row) >= 3:
-                    rows.append(row)
-        return rows
-
     def load_all(self):
 
         self.current_mode = "all"
-        self.update_table(self.get_data())
+        self.query.date = None
+        self.store.poll()
+        self.table.refresh(keep_position=False)
+        self.update_summary()
 
     def load_today(self):
 
         self.current_mode = "today"
-        today = datetime.now().strftime("%Y-%m-%d")
-        data = [row for row in self.get_data() if len(row) >=
-                2 and row[1] == today]
-        self.update_table(data)
+        self.query.date = datetime.now().strftime("%Y-%m-%d")
+        self.store.poll()
+        self.table.refresh(keep_position=False)
+        self.update_summary()
 
     def refresh_current(self):
 
@@ -130,32 +150,147 @@ class ReportWindow(tk.Toplevel):
 
     def auto_refresh(self):
 
-        self.refresh_current()
-        self.after(2000, self.auto_refresh)
+        # only re-count/re-fetch the visible window when the log changed
+        # or the "today" view crossed midnight
+        today = datetime.now().strftime("%Y-%m-%d")
+        day_changed = self.current_mode == "today" and self.query.date != today
+        if day_changed:
+            self.query.date = today
+        if self.store.poll() or day_changed:
+            self.table.refresh()
+            self.update_summary()
+        self._refresh_after_id = self.after(2000, self.auto_refresh)
+
+    def update_summary(self):
+
+        if self.current_mode == "today":
+            summary = self.store.day_summary(self.query.date)
+            text = f"Today: {summary['records']} record(s), {summary['people']} people"
+            if summary["hours"]:
+                busiest = max(summary["hours"], key=summary["hours"].get)
+                text += f", busiest hour {busiest:02d}:00"
+        else:
+            records, people, days = self.store.totals()
+            text = f"All: {records} record(s), {people} people over {days} day(s)"
+        self.summary_label.config(text=text)
+
+    def on_search(self, *args):
 
-    def update_table(self, rows):
+        # debounce typing so each keystroke does not hit the database
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(250, self.apply_search)
 
-        self.tree.delete(*self.tree.get_children())
-        for r in rows:
-            self.tree.insert("", "end", values=r)
+    def apply_search(self):
+
+        self._search_after_id = None
+        self.query.name_like = self.search_var.get().strip()
+        self.table.refresh(keep_position=False)
+
+    def on_close(self):
+
+        if self._refresh_after_id:
+            self.after_cancel(self._refresh_after_id)
+        self.store.close()
+        self.destroy()
 
     # PDF export
 
     def export_pdf(self):
 
-        all_rows = self.get_data()
-
+        today = datetime.now().strftime("%Y-%m-%d")
         if self.current_mode == "today":
-            today = datetime.now().strftime("%Y-%m-%d")
-            rows = [r for r in all_rows if len(r) >= 2 and r[1] == today]
+            ExportDialog(self, self.store, date_from=today, date_to=today)
         else:
-            rows = all_rows
+            ExportDialog(self, self.store)
+
 
-        if not rows:
-            messagebox.showwarning("Warning", "No data available to export!")
+class ExportDialog(tk.Toplevel):
+    """Pick a date range / person and export to PDF in the background"""
+
+    def __init__(self, parent, store, date_from="", date_to=""):
+        super().__init__(parent)
+        self.title("Export Attendance PDF")
+        self.geometry("420x260")
+        self.configure(bg=COLORS["card"])
+        self.resizable(False, False)
+        self.transient(parent)
+
+        self.store = store
+        self.job = None
+        self._closing = False
+
+        form = tk.Frame(self, bg=COLORS["card"], padx=20, pady=15)
+        form.pack(fill="x")
+        form.grid_columnconfigure(1, weight=1)
+
+        self.from_var = tk.StringVar(value=date_from)
+        self.to_var = tk.StringVar(value=date_to)
+        self.person_var = tk.StringVar(value="All")
+
+        for row, (label, widget) in enumerate((
+            ("From (YYYY-MM-DD)", ttk.Entry(form, textvariable=self.from_var)),
+            ("To (YYYY-MM-DD)", ttk.Entry(form, textvariable=self.to_var)),
+            ("Person", ttk.Combobox(form, textvariable=self.person_var,
+                                    values=["All"] + store.names(),
+                                    state="readonly")),
+        )):
+            tk.Label(form, text=label, bg=COLORS["card"], fg=COLORS["text"]).grid(
+                row=row, column=0, sticky="w", pady=4)
+            widget.grid(row=row, column=1, sticky="ew", padx=(10, 0), pady=4)
+
+        self.progress = ttk.Progressbar(self, mode="determinate", maximum=1)
+        self.progress.pack(fill="x", padx=20, pady=(5, 5))
+
+        self.status_label = tk.Label(
+            self, text="", bg=COLORS["card"], fg="#64748B")
+        self.status_label.pack(anchor="w", padx=20)
+
+        btns = tk.Frame(self, bg=COLORS["card"])
+        btns.pack(fill="x", padx=20, pady=10)
+        self.start_btn = tk.Button(
+            btns, text="📥 Export", command=self.start,
+            bg=COLORS["success"], fg="white", font=("Segoe UI", 9, "bold"))
+        self.start_btn.pack(side="right")
+        tk.Button(btns, text="Cancel", command=self.cancel).pack(
+            side="right", padx=10)
+
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+    def read_filters(self):
+        """Return (date_from, date_to, name) or None after showing an error"""
+        values = []
+        for var in (self.from_var, self.to_var):
+            text = var.get().strip()
+            if text:
+                try:
+                    datetime.strptime(text, "%Y-%m-%d")
+                except ValueError:
+                    messagebox.showerror(
+                        "Invalid date", f"'{text}' is not a YYYY-MM-DD date.", parent=self)
+                    return None
+            values.append(text or None)
+        person = self.person_var.get()
+        values.append(None if person in ("", "All") else person)
+        return tuple(values)
+
+    def start(self):
+        if self.job is not None:
+            return
+        filters = self.read_filters()
+        if filters is None:
+            return
+        date_from, date_to, name = filters
+
+        total = self.store.count_rows(
+            date_from=date_from, date_to=date_to, name=name)
+        if not total:
+            messagebox.showwarning(
+                "Warning", "No data available to export!", parent=self)
             return
 
         path = filedialog.asksaveasfilename(
+            parent=self,
             defaultextension=".pdf",
             filetypes=[("PDF files", "*.pdf")],
             title="Save attendance report as PDF"
@@ -163,48 +298,43 @@ class ReportWindow(tk.Toplevel):
         if not path:
             return
 
-        try:
-            pdf = FPDF()
-            pdf.set_auto_page_break(auto=True, margin=15)
-            pdf.add_page()
-
-            # Title
-            pdf.set_font("Helvetica", "B", 16)
-            pdf.cell(0, 10, "Attendance Report", ln=True, align="C")
-            pdf.ln(8)
-
-            pdf.set_font("Helvetica", "", 10)
-            pdf.cell(
-                0,
-                8,
-                f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-                ln=True,
-                align="R"
-            )
-            pdf.ln(4)
-
-            # Table header
-            pdf.set_font("Helvetica", "B", 12)
-            pdf.cell(80, 10, "Name", 1)
-            pdf.cell(50, 10, "Date", 1)
-            pdf.cell(50, 10, "Time", 1)
-            pdf.ln()
-
-            # Table rows
-            pdf.set_font("Helvetica", "", 12)
-            for name, date_str, time_str in rows:
-                pdf.cell(80, 10, str(name), 1)
-                pdf.cell(50, 10, str(date_str), 1)
-                pdf.cell(50, 10, str(time_str), 1)
-                pdf.ln()
-
-            pdf.output(path)
-            messagebox.showinfo(
-                "Success", "PDF Report downloaded successfully!")
+        from report_export import PdfExportJob
+        self.job = PdfExportJob(self.store, path, date_from, date_to, name)
+        self.progress.configure(maximum=max(1, self.job.total), value=0)
+        self.start_btn.configure(state="disabled")
+        self.job.start()
+        self.poll()
+
+    def poll(self):
+        job = self.job
+        self.progress.configure(value=job.done)
+        self.status_label.config(text=f"{job.done} / {job.total} rows")
+        if not job.finished:
+            self.after(100, self.poll)
+            return
 
-        except Exception as e:
+        self.job = None
+        self.start_btn.configure(state="normal")
+        if job.error is not None:
             messagebox.showerror(
-                "Error", f"Failed to generate PDF:\n{repr(e)}")
+                "Error", f"Failed to generate PDF:\n{repr(job.error)}", parent=self)
+        elif job.cancelled:
+            self.status_label.config(text="Export cancelled.")
+            if self._closing:
+                self.destroy()
+        else:
+            messagebox.showinfo(
+                "Success", "PDF Report downloaded successfully!", parent=self)
+            self.destroy()
+
+    def cancel(self):
+        if self.job is not None:
+            # let the worker stop at the next chunk; poll() closes the window
+            self._closing = True
+            self.job.cancel()
+            self.status_label.config(text="Cancelling...")
+        else:
+            self.destroy()
 
 # REGISTERD DATA WINDOW
 
@@ -216,8 +346,15 @@ class RegisteredDataWindow(tk.Toplevel):
         self.geometry("900x600")
         self.configure(bg=COLORS["bg"])
 
+        from thumbnail_cache import ThumbnailCache
+
         # State
+        self.thumbs = ThumbnailCache()
+        self.index = DatasetIndex(DATASET_DIR)
         self.users = self.get_users()
+        self.thumbs.prune_in_background(lambda: [
+            os.path.join(self.index.dataset_dir, rel_path)
+            for _, rel_path, _, _ in self.index.records()])
         self.current_user = None
         self.image_paths = []
         self.current_index = 0
@@ -307,14 +444,16 @@ class RegisteredDataWindow(tk.Toplevel):
             padx=10, pady=6
         ).grid(row=0, column=2, padx=15)
 
-    def get_users(self):
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
-        if not os.path.exists(DATASET_DIR):
-            return []
-        return sorted(
-            d for d in os.listdir(DATASET_DIR)
-            if os.path.isdir(os.path.join(DATASET_DIR, d))
-        )
+    def on_close(self):
+        self.thumbs.close()
+        self.index.close()
+        self.destroy()
+
+    def get_users(self):
+        self.index.refresh()
+        return self.index.users()
 
     def on_user_select(self, event):
         if not self.listbox.curselection():
@@ -323,14 +462,8 @@ class RegisteredDataWindow(tk.Toplevel):
         user = self.listbox.get(idx)
         self.current_user = user
 
-        user_dir = os.path.join(DATASET_DIR, user)
-        files = []
-        if os.path.exists(user_dir):
-            for name in os.listdir(user_dir):
-                if name.lower().endswith((".jpg", ".jpeg", ".png")):
-                    files.append(os.path.join(user_dir, name))
-
-        self.image_paths = sorted(files)
+        self.index.refresh_user(user)
+        self.image_paths = self.index.images(user)
         self.current_index = 0
 
         if not self.image_paths:
@@ -345,9 +478,11 @@ class RegisteredDataWindow(tk.Toplevel):
     def show_current_image(self):
         if not self.image_paths:
             return
+        from PIL import ImageTk, ImageOps
+
         path = self.image_paths[self.current_index]
         try:
-            img = Image.open(path)
+            img = self.thumbs.get(path)
 
             w = self.photo_label.winfo_width() or 600
             h = self.photo_label.winfo_height() or 400
@@ -359,6 +494,16 @@ class RegisteredDataWindow(tk.Toplevel):
             print(f"Error loading {path}: {e}")
             self.photo_label.config(text="Error loading image", image="")
             self.current_photo = None
+        self.prefetch_neighbours()
+
+    def prefetch_neighbours(self, span=2):
+        """Decode the photos Previous/Next would show, in the background"""
+        count = len(self.image_paths)
+        if count < 2:
+            return
+        offsets = [d for step in range(1, span + 1) for d in (step, -step)]
+        self.thumbs.prefetch(
+            self.image_paths[(self.current_index + d) % count] for d in offsets)
 
     def show_next(self):
         if not self.image_paths:
@@ -386,11 +531,12 @@ class RegisteredDataWindow(tk.Toplevel):
             )
             return
 
-        user_dir = os.path.join(DATASET_DIR, self.current_user)
-        if not os.path.exists(user_dir):
+        self.index.refresh_user(self.current_user)
+        paths = self.index.images(self.current_user)
+        if not paths:
             messagebox.showerror(
                 "Error",
-                "User photo folder not found on disk."
+                "No photos found for this user."
             )
             return
 
@@ -411,7 +557,9 @@ class RegisteredDataWindow(tk.Toplevel):
             return
 
         try:
-            shutil.copytree(user_dir, target)
+            os.makedirs(target)
+            for path in paths:
+                shutil.copy2(path, target)
             messagebox.showinfo(
                 "Success",
                 f"Photos for '{self.current_user}' copied to:\n{target}"
@@ -431,7 +579,14 @@ class MainDashboard:
         self.root.title("Face Attendance System v2.0")
         self.root.geometry("1000x600")
         self.root.configure(bg=COLORS["bg"])
+        self.store = AttendanceStore(ATTENDANCE_DB, ATTENDANCE_PATH)
+        # warm up the recognition daemon while the user looks at the menu
+        self.daemon = DaemonClient()
+        self.daemon.start()
+        self._launch_events = queue.Queue()
         self._setup_ui()
+        self.poll_launches()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def _setup_ui(self):
         # Sidebar
@@ -486,17 +641,9 @@ class MainDashboard:
         )
         card.pack(fill="x")
 
-        # Calculate today's count initially
+        # Today's count comes from the precomputed daily counter
         today = datetime.now().strftime("%Y-%m-%d")
-        count = 0
-        if os.path.exists(ATTENDANCE_PATH):
-            with open(ATTENDANCE_PATH, "r", newline="") as f:
-                reader = csv.reader(f)
-                header = next(reader, None)  # skip header
-                for row in reader:
-                    # row: [Name, Date, Time]
-                    if len(row) >= 2 and row[1] == today:
-                        count += 1
+        count = self.store.day_count(today)
 
         tk.Label(
             card,
@@ -533,38 +680,67 @@ class MainDashboard:
         btn.pack(fill="x")
 
     def run_register(self):
-        if os.path.exists(REGISTER_SCRIPT):
-            subprocess.Popen(["python", REGISTER_SCRIPT])
-        else:
-            messagebox.showerror(
-                "Error", f"File '{REGISTER_SCRIPT}' not found!")
+        self.launch("register", REGISTER_SCRIPT)
 
     def run_attendance(self):
-        if os.path.exists(MARK_ATTENDANCE_SCRIPT):
+        self.launch("attendance", MARK_ATTENDANCE_SCRIPT,
+                    on_closed=self.update_today_count)
 
-            subprocess.call(["python", MARK_ATTENDANCE_SCRIPT])
+    def launch(self, window, script, on_closed=None):
+        """
+        Open `window` in the recognition daemon, where the models and the
+        gallery are already loaded; if no daemon answers, run `script` in
+        a fresh process as before. The window is waited on from a worker
+        thread, so the dashboard stays responsive; `on_closed` then runs on
+        the Tk thread.
+        """
+        if not os.path.exists(script):
+            messagebox.showerror("Error", f"File '{script}' not found!")
+            return
+        threading.Thread(target=self._launch_worker,
+                         args=(window, script, on_closed), daemon=True).start()
 
-            self.update_today_count()
+    def _launch_worker(self, window, script, on_closed):
+        try:
+            conn = self.daemon.open_window(window)
+        except RuntimeError as e:
+            msg = f"Cannot open the {window} window:\n{e}"
+            self._launch_events.put(lambda m=msg: messagebox.showerror("Error", m))
+            return
+        if conn is None:
+            subprocess.call(["python", script])
         else:
-            messagebox.showerror(
-                "Error", f"File '{MARK_ATTENDANCE_SCRIPT}' not found!")
+            try:
+                conn.recv()  # {"closed": True}
+            except (OSError, EOFError):
+                pass
+            finally:
+                conn.close()
+        if on_closed is not None:
+            self._launch_events.put(on_closed)
+
+    def poll_launches(self):
+        while True:
+            try:
+                callback = self._launch_events.get_nowait()
+            except queue.Empty:
+                break
+            callback()
+        self.root.after(200, self.poll_launches)
+
+    def on_close(self):
+        self.daemon.stop()
+        self.store.close()
+        self.root.destroy()
 
     def update_today_count(self):
         """
-        Recalculate today's attendance count from attendance/attendance.csv
-        and update the big label on the dashboard.
+        Refresh today's attendance count from the daily counter; poll()
+        only imports rows appended to attendance.csv since the last call.
         """
+        self.store.poll()
         today = datetime.now().strftime("%Y-%m-%d")
-        count = 0
-
-        if os.path.exists(ATTENDANCE_PATH):
-            with open(ATTENDANCE_PATH, "r", newline="") as f:
-                reader = csv.reader(f)
-                header = next(reader, None)  # skip header
-                for row in reader:
-                    # row format: [Name, Date, Time]
-                    if len(row) >= 2 and row[1] == today:
-                        count += 1
+        count = self.store.day_count(today)
 
         self.count_label.config(text=f"{count} Person Present")
 
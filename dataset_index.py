@@ -0,0 +1,232 @@
+"""
+Persistent index of dataset/faces (users, images, sizes, hashes, capture
+time and encoding status) in SQLite, so the GUIs and the encoder do not
+rediscover the dataset with a listdir/stat walk on every call.
+
+refresh() reconciles the index with the disk cheaply: one listdir of the
+dataset root and one stat per user folder. Only folders whose mtime moved
+(an image was added, removed or renamed) are re-listed. Writers that know
+what they changed (the registration capture writer, the web service)
+record it directly with add_image() / remove_user(). An image rewritten
+in place does not move its folder's mtime; refresh(deep=True) stats every
+file to catch that.
+
+    python dataset_index.py            # refresh and print a summary
+    python dataset_index.py --deep
+"""
+import os
+import stat
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+
+DATASET_DIR = os.path.join("dataset", "faces")
+DATASET_DB = os.path.join("dataset", "index.db")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    name      TEXT PRIMARY KEY,
+    dir_mtime INTEGER
+);
+CREATE TABLE IF NOT EXISTS images (
+    path        TEXT PRIMARY KEY,   -- relative to the dataset dir
+    user        TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    mtime       INTEGER NOT NULL,
+    sha1        TEXT,
+    captured_at TEXT,
+    encoded     INTEGER             -- NULL pending, 1 encoded, 0 no usable face
+);
+CREATE INDEX IF NOT EXISTS images_user ON images (user, path);
+"""
+
+
+class DatasetIndex:
+    """
+    `db_path` defaults to index.db next to the dataset folder, so a dataset
+    elsewhere (tests, another site) gets its own index.
+    """
+
+    def __init__(self, dataset_dir=DATASET_DIR, db_path=None):
+        if db_path is None:
+            db_path = os.path.join(
+                os.path.dirname(os.path.abspath(dataset_dir)), "index.db")
+        self.dataset_dir = dataset_dir
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(
+            db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _write(self, fn, *args):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(*args)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    # Reconciling with the disk
+
+    def _sync_user(self, name, dir_mtime, deep=False):
+        user_dir = os.path.join(self.dataset_dir, name)
+        known = {path: (size, mtime) for path, size, mtime in self.conn.execute(
+            "SELECT path, size, mtime FROM images WHERE user = ?", (name,))}
+        seen = set()
+        for fname in os.listdir(user_dir):
+            if not fname.lower().endswith(IMAGE_EXTS):
+                continue
+            rel_path = os.path.join(name, fname)
+            seen.add(rel_path)
+            if rel_path in known and not deep:
+                continue
+            try:
+                st = os.stat(os.path.join(user_dir, fname))
+            except OSError:
+                seen.discard(rel_path)
+                continue
+            if known.get(rel_path) == (st.st_size, st.st_mtime_ns):
+                continue
+            self._upsert(name, rel_path, st)
+        gone = [(p,) for p in known if p not in seen]
+        self.conn.executemany("DELETE FROM images WHERE path = ?", gone)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO users (name, dir_mtime) VALUES (?, ?)",
+            (name, dir_mtime))
+
+    def _upsert(self, user, rel_path, st, captured_at=None):
+        captured_at = captured_at or datetime.fromtimestamp(
+            st.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+        # a changed file needs encoding again and its old hash is void
+        self.conn.execute(
+            "INSERT INTO images (path, user, size, mtime, captured_at) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET size = excluded.size, "
+            "mtime = excluded.mtime, sha1 = NULL, encoded = NULL",
+            (rel_path, user, st.st_size, st.st_mtime_ns, captured_at))
+
+    def _refresh(self, deep):
+        try:
+            names = os.listdir(self.dataset_dir)
+        except OSError:
+            names = []
+        known = dict(self.conn.execute("SELECT name, dir_mtime FROM users"))
+        present = set()
+        for name in names:
+            try:
+                st = os.stat(os.path.join(self.dataset_dir, name))
+            except OSError:
+                continue
+            if not stat.S_ISDIR(st.st_mode):
+                continue
+            present.add(name)
+            if deep or known.get(name) != st.st_mtime_ns:
+                self._sync_user(name, st.st_mtime_ns, deep)
+        for name in set(known) - present:
+            self._remove_user(name)
+
+    def refresh(self, deep=False):
+        """Bring the index in line with the dataset folder"""
+        self._write(self._refresh, deep)
+
+    def refresh_user(self, name):
+        """Re-list one user's folder if its mtime moved"""
+        def sync():
+            try:
+                mtime = os.stat(os.path.join(self.dataset_dir, name)).st_mtime_ns
+            except OSError:
+                self._remove_user(name)
+                return
+            row = self.conn.execute(
+                "SELECT dir_mtime FROM users WHERE name = ?", (name,)).fetchone()
+            if row is None or row[0] != mtime:
+                self._sync_user(name, mtime)
+        self._write(sync)
+
+    # Writers
+
+    def add_image(self, abs_path, captured_at=None):
+        """Record an image just written under dataset_dir/<user>/"""
+        rel_path = os.path.relpath(abs_path, self.dataset_dir)
+        user = rel_path.split(os.sep, 1)[0]
+        st = os.stat(abs_path)
+
+        def add():
+            # dir_mtime is left alone: the next refresh re-lists this user
+            # once, in case something else changed the folder too
+            self.conn.execute(
+                "INSERT OR IGNORE INTO users (name, dir_mtime) VALUES (?, NULL)",
+                (user,))
+            self._upsert(user, rel_path, st, captured_at)
+        self._write(add)
+
+    def _remove_user(self, name):
+        self.conn.execute("DELETE FROM images WHERE user = ?", (name,))
+        self.conn.execute("DELETE FROM users WHERE name = ?", (name,))
+
+    def remove_user(self, name):
+        self._write(self._remove_user, name)
+
+    def set_encoded(self, results):
+        """results: iterable of (rel_path, sha1, encoded bool)"""
+        self._write(lambda: self.conn.executemany(
+            "UPDATE images SET sha1 = ?, encoded = ? WHERE path = ?",
+            [(sha1, int(ok), rel_path) for rel_path, sha1, ok in results]))
+
+    # Queries
+
+    def users(self):
+        with self._lock:
+            return [name for (name,) in self.conn.execute(
+                "SELECT name FROM users ORDER BY name")]
+
+    def images(self, user):
+        """Sorted absolute paths of a user's images"""
+        with self._lock:
+            return [os.path.join(self.dataset_dir, path) for (path,) in self.conn.execute(
+                "SELECT path FROM images WHERE user = ? ORDER BY path", (user,))]
+
+    def records(self):
+        """(user, rel_path, size, mtime_ns) for every image, in path order"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT user, path, size, mtime FROM images ORDER BY path").fetchall()
+
+    def summary(self):
+        with self._lock:
+            users, images, pending, unusable = self.conn.execute(
+                "SELECT COUNT(DISTINCT user), COUNT(*), "
+                "SUM(encoded IS NULL), SUM(encoded = 0) FROM images").fetchone()
+        return {"users": users, "images": images,
+                "pending": pending or 0, "unusable": unusable or 0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the dataset index")
+    parser.add_argument("--dataset", default=DATASET_DIR)
+    parser.add_argument("--db", default=None,
+                        help=f"index database (default: {DATASET_DB})")
+    parser.add_argument("--deep", action="store_true",
+                        help="stat every image, not only changed folders")
+    args = parser.parse_args()
+
+    index = DatasetIndex(args.dataset, args.db)
+    index.refresh(deep=args.deep)
+    s = index.summary()
+    print(f"{s['users']} user(s), {s['images']} image(s); "
+          f"{s['pending']} not yet encoded, {s['unusable']} without a usable face.")
+    index.close()
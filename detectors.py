@@ -0,0 +1,127 @@
+"""
+Face detector backends. Every detector takes an RGB uint8 image and
+returns face_recognition-style (top, right, bottom, left) boxes, so the
+face_recognition encoder can be fed from any of them.
+
+    hog   face_recognition's dlib HOG detector (the original behaviour)
+    haar  OpenCV Haar cascade; fastest, more false positives
+    dnn   OpenCV DNN ResNet-10 SSD; needs the model files in models/:
+          deploy.prototxt
+          res10_300x300_ssd_iter_140000.caffemodel
+"""
+import os
+
+import cv2
+import face_recognition
+
+
+MODELS_DIR = "models"
+DNN_PROTOTXT = "deploy.prototxt"
+DNN_WEIGHTS = "res10_300x300_ssd_iter_140000.caffemodel"
+DEFAULT_DETECTOR = "hog"
+
+
+def _clip(box, height, width):
+    top, right, bottom, left = box
+    return (max(0, top), min(width, right), min(height, bottom), max(0, left))
+
+
+class HogDetector:
+    """dlib HOG via face_recognition; `upsample` finds smaller faces"""
+
+    def __init__(self, upsample=1):
+        self.upsample = upsample
+
+    def detect(self, rgb, upsample=None):
+        return face_recognition.face_locations(
+            rgb, number_of_times_to_upsample=self.upsample if upsample is None else upsample)
+
+
+class HaarDetector:
+    """
+    Haar cascade on the grey image. `upsample` doubles the image that many
+    times first, which lets it find faces below `min_size`.
+    """
+
+    def __init__(self, cascade_path=None, scale_factor=1.1, min_neighbors=5,
+                 min_size=(24, 24), upsample=0):
+        if cascade_path is None:
+            cascade_path = os.path.join(
+                cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise FileNotFoundError(f"Cannot load Haar cascade {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self.upsample = upsample
+
+    def detect(self, rgb, upsample=None):
+        upsample = self.upsample if upsample is None else upsample
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        factor = 2 ** upsample
+        if factor > 1:
+            gray = cv2.resize(gray, (0, 0), fx=factor, fy=factor)
+        found = self.cascade.detectMultiScale(
+            gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+            minSize=self.min_size)
+        height, width = rgb.shape[:2]
+        return [
+            _clip((y // factor, (x + w) // factor, (y + h) // factor, x // factor),
+                  height, width)
+            for x, y, w, h in (map(int, box) for box in found)
+        ]
+
+
+class DnnDetector:
+    """
+    OpenCV DNN SSD (ResNet-10, 300x300 input). Resolution independent, so
+    `upsample` is accepted and ignored.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, confidence=0.5, input_size=300):
+        prototxt = os.path.join(models_dir, DNN_PROTOTXT)
+        weights = os.path.join(models_dir, DNN_WEIGHTS)
+        for path in (prototxt, weights):
+            if not os.path.exists(path):
+                raise FileNotFoundError(
+                    f"DNN face detector model missing: {path}")
+        self.net = cv2.dnn.readNetFromCaffe(prototxt, weights)
+        self.confidence = confidence
+        self.input_size = input_size
+
+    def detect(self, rgb, upsample=None):
+        height, width = rgb.shape[:2]
+        size = (self.input_size, self.input_size)
+        # the model expects BGR input minus these per-channel (B, G, R) means;
+        # blobFromImage swaps R/B first and then subtracts the mean, so the
+        # mean is given in the output (BGR) order
+        blob = cv2.dnn.blobFromImage(
+            cv2.resize(rgb, size), 1.0, size, (104.0, 177.0, 123.0), swapRB=True)
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+
+        boxes = []
+        for det in detections:
+            if det[2] < self.confidence:
+                continue
+            left, top, right, bottom = map(
+                int, det[3:7] * [width, height, width, height])
+            if right <= left or bottom <= top:
+                continue
+            boxes.append(_clip((top, right, bottom, left), height, width))
+        return boxes
+
+
+DETECTORS = {
+    "hog": HogDetector,
+    "haar": HaarDetector,
+    "dnn": DnnDetector,
+}
+
+
+def build_detector(kind=DEFAULT_DETECTOR, **kwargs):
+    if kind not in DETECTORS:
+        raise ValueError(
+            f"Unknown face detector '{kind}' (choose from {', '.join(DETECTORS)})")
+    return DETECTORS[kind](**kwargs)
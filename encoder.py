@@ -0,0 +1,456 @@
+import os
+import sys
+import time
+import pickle
+import hashlib
+import argparse
+from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
+
+import dlib
+import numpy as np
+import face_recognition
+from face_recognition import api as face_api
+
+from dataset_index import DATASET_DIR, DatasetIndex
+from detectors import DEFAULT_DETECTOR, DETECTORS, build_detector
+from gallery_compact import compact_gallery, compaction_settings
+from gallery_store import GALLERY_DIR, save_gallery
+
+
+ENCODINGS_PATH = os.path.join("encodings", "face_encodings.pkl")
+MANIFEST_PATH = os.path.join("encodings", "manifest.pkl")
+MANIFEST_VERSION = 1
+# images handed to a pool worker at a time; also the descriptor batch size,
+# so a worker's batch can fill
+CHUNK_SIZE = 32
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-1 of a file's contents"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def scan_dataset(dataset_dir=DATASET_DIR, index=None, deep=False):
+    """
+    Return sorted (user, relative_path, size, mtime_ns) for every image in
+    the dataset, from the dataset index after bringing it up to date.
+    """
+    index = index or DatasetIndex(dataset_dir)
+    index.refresh(deep=deep)
+    return index.records()
+
+
+_detectors = {}
+
+
+def get_detector(kind=DEFAULT_DETECTOR):
+    """One detector per kind per process (pool workers build their own)"""
+    if kind not in _detectors:
+        _detectors[kind] = build_detector(kind)
+    return _detectors[kind]
+
+
+class BatchEncoder:
+    """
+    Decode -> detect -> encode for many images, with the per-call overhead
+    amortised:
+      - images are decoded by a thread pool ahead of the detector
+        (decoding releases the GIL),
+      - landmarks are taken per image, but the 128-d descriptors are
+        computed by dlib for up to `batch_size` faces in one call.
+    Only images with exactly one face are encoded.
+    `stages` accumulates seconds per stage; "decode" is time spent waiting
+    on the decode threads, i.e. what the prefetch did not hide.
+    """
+
+    def __init__(self, detector=None, decode_workers=2, batch_size=CHUNK_SIZE):
+        self.detector = detector or get_detector()
+        self.decode_workers = max(1, decode_workers)
+        self.batch_size = max(1, batch_size)
+        self.stages = {"decode": 0.0, "detect": 0.0, "landmarks": 0.0,
+                       "encode": 0.0}
+
+    @staticmethod
+    def _decode(path):
+        try:
+            return face_recognition.load_image_file(path), None
+        except Exception as e:
+            return None, e
+
+    def _flush(self, batch, out):
+        if not batch:
+            return
+        start = time.perf_counter()
+        images = [image for _, image, _ in batch]
+        shapes = []
+        for _, _, shape in batch:
+            faces = dlib.full_object_detections()
+            faces.append(shape)
+            shapes.append(faces)
+        try:
+            descriptors = face_api.face_encoder.compute_face_descriptor(images, shapes)
+            encodings = [np.array(d[0]) for d in descriptors]
+        except TypeError:
+            # dlib without the batched overload
+            encodings = [
+                np.array(face_api.face_encoder.compute_face_descriptor(image, shape))
+                for _, image, shape in batch
+            ]
+        for (i, _, _), encoding in zip(batch, encodings):
+            out[i] = encoding
+        self.stages["encode"] += time.perf_counter() - start
+        batch.clear()
+
+    def encode(self, paths):
+        """
+        Return one item per path: the encoding (numpy array), None when the
+        image does not hold exactly one face, or the exception raised
+        while decoding it.
+        """
+        out = [None] * len(paths)
+        batch = []
+        with ThreadPoolExecutor(self.decode_workers) as pool:
+            decoded = pool.map(self._decode, paths)
+            for i in range(len(paths)):
+                start = time.perf_counter()
+                image, error = next(decoded)
+                self.stages["decode"] += time.perf_counter() - start
+                if error is not None:
+                    out[i] = error
+                    continue
+
+                start = time.perf_counter()
+                locations = self.detector.detect(image)
+                self.stages["detect"] += time.perf_counter() - start
+                if len(locations) != 1:
+                    continue
+
+                start = time.perf_counter()
+                top, right, bottom, left = locations[0]
+                shape = face_api.pose_predictor_5_point(
+                    image, dlib.rectangle(left, top, right, bottom))
+                self.stages["landmarks"] += time.perf_counter() - start
+
+                batch.append((i, image, shape))
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, out)
+            self._flush(batch, out)
+        return out
+
+
+def atomic_pickle_dump(data, path):
+    """Write a pickle next to `path` and rename it into place"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    """
+    Manifest: {relative_path: {"user", "size", "mtime", "sha1", "encoding"}}.
+    "encoding" is None for images that did not contain exactly one face;
+    images that could not be read also carry an "error" message.
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "rb") as f:
+            data = pickle.load(f)
+    except Exception as e:
+        print(f"Ignoring unreadable manifest {manifest_path}: {e}")
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data["images"]
+
+
+def save_manifest(images, manifest_path=MANIFEST_PATH):
+    ordered = {rel_path: images[rel_path] for rel_path in sorted(images)}
+    atomic_pickle_dump(
+        {"version": MANIFEST_VERSION, "images": ordered}, manifest_path)
+
+
+def gallery_from_manifest(images):
+    """
+    Build the {'encodings', 'names'} store in stable (path-sorted) order.
+    Names are interned and arrays rebuilt from plain floats so
+    pickle's memo sees the same objects no matter which worker produced an
+    entry, keeping rebuilds byte-identical.
+    """
+    known_encodings = []
+    known_names = []
+    for rel_path in sorted(images):
+        entry = images[rel_path]
+        if entry["encoding"] is not None:
+            known_encodings.append(
+                np.array(np.asarray(entry["encoding"]).tolist(), dtype=np.float64))
+            known_names.append(sys.intern(entry["user"]))
+    return {"encodings": known_encodings, "names": known_names}
+
+
+def plan_update(images, records, dataset_dir=DATASET_DIR, full_rebuild=False):
+    """
+    Compare the dataset index `records` (see scan_dataset) with the manifest.
+    Returns (kept, todo, removed): manifest entries still valid, (user,
+    rel_path, stat) tuples that need encoding, and paths that disappeared.
+    Only images that look new or changed are stat'ed.
+    """
+    kept = {}
+    todo = []
+    for user, rel_path, size, mtime in records:
+        entry = None if full_rebuild else images.get(rel_path)
+        if (entry is not None and entry["user"] == user
+                and entry["size"] == size and entry["mtime"] == mtime):
+            kept[rel_path] = entry
+            continue
+        abs_path = os.path.join(dataset_dir, rel_path)
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            continue
+        if entry is not None and entry["user"] == user:
+            # touched but maybe not changed: fall back to the content hash
+            if entry["size"] == st.st_size and entry["sha1"] == file_digest(abs_path):
+                kept[rel_path] = dict(entry, mtime=st.st_mtime_ns)
+                continue
+        todo.append((user, rel_path, st))
+    removed = sorted(set(images) - {rel_path for _, rel_path, _, _ in records})
+    return kept, todo, removed
+
+
+def manifest_entry(user, abs_path, st, encoding):
+    return {
+        "user": user,
+        "size": st.st_size,
+        "mtime": st.st_mtime_ns,
+        "sha1": file_digest(abs_path),
+        "encoding": encoding,
+    }
+
+
+def failed_entry(user, st, error):
+    """
+    Manifest entry for an image that could not be read. Its size and mtime
+    are kept, so it is skipped until the file changes instead of being
+    re-decoded (and re-reported) on every run.
+    """
+    return {
+        "user": user,
+        "size": st.st_size,
+        "mtime": st.st_mtime_ns,
+        "sha1": None,
+        "encoding": None,
+        "error": str(error),
+    }
+
+
+def encode_chunk(dataset_dir, chunk, detector_kind=DEFAULT_DETECTOR,
+                 decode_workers=2, batch_size=CHUNK_SIZE):
+    """
+    Encode a list of (user, rel_path, stat) jobs. Runs inside pool workers,
+    so it only returns plain data: ([(rel_path, manifest entry)], stage
+    seconds); unreadable images get a failed_entry().
+    """
+    encoder = BatchEncoder(get_detector(detector_kind), decode_workers, batch_size)
+    abs_paths = [os.path.join(dataset_dir, rel_path) for _, rel_path, _ in chunk]
+    encodings = encoder.encode(abs_paths)
+
+    results = []
+    for (user, rel_path, st), abs_path, encoding in zip(chunk, abs_paths, encodings):
+        try:
+            if isinstance(encoding, Exception):
+                raise encoding
+            results.append(
+                (rel_path, manifest_entry(user, abs_path, st, encoding)))
+        except Exception as e:
+            print(f"Error processing {abs_path}: {e}")
+            results.append((rel_path, failed_entry(user, st, e)))
+    return results, encoder.stages
+
+
+def _encode_chunk_job(job):
+    return encode_chunk(*job)
+
+
+def update_encodings(dataset_dir=DATASET_DIR, encodings_path=ENCODINGS_PATH,
+                     manifest_path=MANIFEST_PATH, full_rebuild=False,
+                     gallery_dir=GALLERY_DIR,
+                     workers=1, chunk_size=CHUNK_SIZE, checkpoint_every=5.0,
+                     progress=None, detector=DEFAULT_DETECTOR,
+                     decode_workers=2, batch_size=None,
+                     prototypes=None, keep_raw=None, rescan=False):
+    """
+    Encode only new or changed images, drop deleted ones and rewrite the
+    encodings store (pickle plus the mmap gallery in `gallery_dir`) from the
+    manifest. Returns a small stats dict.
+
+    With workers > 1 the pending images are split into chunks of
+    `chunk_size` and encoded by a process pool. The manifest is checkpointed
+    every `checkpoint_every` seconds, so an interrupted run picks up where
+    it stopped. `progress(done, total, images_per_sec)` is called after each
+    chunk. `detector` names the detectors.py backend used to find the face;
+    switching it only affects images encoded from then on. Output order
+    only depends on the image paths, so repeated rebuilds write
+    byte-identical stores.
+
+    Within a chunk images are decoded by `decode_workers` threads ahead of
+    detection and faces are encoded `batch_size` (default: `chunk_size`)
+    at a time (see BatchEncoder); stats["stages"] has the summed per-stage
+    seconds.
+
+    With `prototypes` > 0 the mmap gallery holds at most that many
+    prototypes per person (see gallery_compact.py); the pickle and the
+    manifest keep every encoding, and `keep_raw` also stores them next to
+    the gallery. Left as None, both follow the current gallery's header,
+    so a plain incremental update (the GUIs) keeps a compacted gallery
+    compacted; prototypes=0 writes every encoding again.
+
+    The image list comes from the dataset index (dataset_index.py), which
+    only re-lists user folders that changed. An image overwritten in place
+    is only noticed with `rescan`, which stats every file.
+    """
+    os.makedirs(os.path.dirname(encodings_path) or ".", exist_ok=True)
+    index = DatasetIndex(dataset_dir)
+    images = load_manifest(manifest_path)
+    records = scan_dataset(dataset_dir, index, deep=rescan or full_rebuild)
+    kept, todo, removed = plan_update(images, records, dataset_dir, full_rebuild)
+    reused = len(kept)
+
+    batch_size = batch_size or chunk_size
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    jobs = [(dataset_dir, chunk, detector, decode_workers, batch_size)
+            for chunk in chunks]
+    done = 0
+    encoded = 0
+    no_face = 0
+    failed = 0
+    stages = {}
+    start = last_checkpoint = time.perf_counter()
+
+    def collect(job_result):
+        nonlocal done, encoded, no_face, failed, last_checkpoint
+        results, chunk_stages = job_result
+        for stage, seconds in chunk_stages.items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+        for rel_path, entry in results:
+            if "error" in entry:
+                failed += 1
+            elif entry["encoding"] is None:
+                no_face += 1
+            else:
+                encoded += 1
+            kept[rel_path] = entry
+        done += len(results)
+        now = time.perf_counter()
+        if progress is not None:
+            progress(done, len(todo), done / max(now - start, 1e-9))
+        if now - last_checkpoint >= checkpoint_every:
+            save_manifest(kept, manifest_path)
+            last_checkpoint = now
+
+    if workers > 1 and len(chunks) > 1:
+        with Pool(min(workers, len(chunks))) as pool:
+            for results in pool.imap_unordered(_encode_chunk_job, jobs):
+                collect(results)
+    else:
+        for job in jobs:
+            collect(_encode_chunk_job(job))
+
+    data = gallery_from_manifest(kept)
+    atomic_pickle_dump(data, encodings_path)
+    if gallery_dir:
+        current, dedup_distance, current_raw = compaction_settings(gallery_dir)
+        if prototypes is None:
+            prototypes = current
+        if keep_raw is None:
+            keep_raw = current_raw
+        if prototypes > 0:
+            save_gallery(compact_gallery(data, prototypes, dedup_distance), gallery_dir,
+                         raw=data if keep_raw else None)
+        else:
+            save_gallery(data, gallery_dir)
+    save_manifest(kept, manifest_path)
+    index.set_encoded(
+        [(rel_path, entry["sha1"], entry["encoding"] is not None)
+         for rel_path, entry in kept.items()])
+    index.close()
+    return {
+        "encoded": encoded,
+        "no_face": no_face,
+        "failed": failed,
+        "reused": reused,
+        "removed": len(removed),
+        "faces": len(data["names"]),
+        "seconds": time.perf_counter() - start,
+        "stages": stages,
+    }
+
+
+def print_progress(done, total, rate):
+    sys.stdout.write(f"\r{done}/{total} images  {rate:6.1f} img/s")
+    sys.stdout.flush()
+    if done == total:
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Update encodings/face_encodings.pkl from dataset/faces")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="ignore the manifest and re-encode every image; "
+                             "an interrupted rebuild resumes from its checkpoints "
+                             "only if rerun without this flag")
+    parser.add_argument("--rescan", action="store_true",
+                        help="stat every image, to catch files overwritten in place")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="encoder processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="images handed to a worker at a time")
+    parser.add_argument("--dataset", default=DATASET_DIR)
+    parser.add_argument("--output", default=ENCODINGS_PATH)
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    parser.add_argument("--gallery", default=GALLERY_DIR)
+    parser.add_argument("--decode-workers", type=int, default=2,
+                        help="image decode threads per encoder process")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="faces per dlib descriptor call (default: the chunk size)")
+    parser.add_argument("--prototypes", type=int, default=None,
+                        help="compact the gallery to at most this many "
+                             "prototypes per person (0 = keep every encoding; "
+                             "default: as the current gallery)")
+    parser.add_argument("--keep-raw", action=argparse.BooleanOptionalAction,
+                        default=None,
+                        help="with --prototypes, store the raw encodings for audit "
+                             "(default: as the current gallery)")
+    parser.add_argument("--detector", default=DEFAULT_DETECTOR,
+                        choices=sorted(DETECTORS),
+                        help="face detector (combine with --full-rebuild to "
+                             "re-encode existing images)")
+    args = parser.parse_args()
+
+    stats = update_encodings(args.dataset, args.output, args.manifest,
+                             gallery_dir=args.gallery,
+                             full_rebuild=args.full_rebuild,
+                             workers=args.workers,
+                             chunk_size=max(1, args.chunk_size),
+                             progress=print_progress,
+                             detector=args.detector,
+                             decode_workers=args.decode_workers,
+                             batch_size=args.batch_size,
+                             prototypes=args.prototypes,
+                             keep_raw=args.keep_raw,
+                             rescan=args.rescan)
+    print(f"Encoded {stats['encoded']} ({stats['no_face']} without a face, "
+          f"{stats['failed']} failed), "
+          f"reused {stats['reused']}, removed {stats['removed']}; "
+          f"gallery has {stats['faces']} face(s) "
+          f"[{stats['seconds']:.1f}s].")
+    if stats["stages"]:
+        print("Stage time (summed over workers): " + ", ".join(
+            f"{stage} {seconds:.1f}s" for stage, seconds in stats["stages"].items()))
@@ -0,0 +1,146 @@
+"""
+Per-identity gallery compaction.
+
+Registration stores one encoding per accepted photo, so a user with 15
+near-identical captures costs 15 rows on every match. compact_gallery()
+replaces each person's rows with at most `max_prototypes` prototypes:
+
+    centroid   mean of all their encodings
+    medoids    k-medoids of the de-duplicated encodings, so distinct
+               poses / lighting conditions keep a representative
+
+Encodings within `dedup_distance` of one already kept are dropped first.
+The raw encodings stay in the manifest, and can also be written next to
+the gallery for audit (save_gallery(..., raw=...)).
+
+    python gallery_compact.py --prototypes 4
+"""
+import argparse
+
+import numpy as np
+
+from gallery_index import _sq_dists
+from gallery_store import (ENCODING_DIM, ENCODINGS_PATH, GALLERY_DIR, load_pickle,
+                           read_header, save_gallery)
+
+
+MAX_PROTOTYPES = 4
+DEDUP_DISTANCE = 0.15
+
+
+def dedupe(encodings, dedup_distance=DEDUP_DISTANCE):
+    """Greedy near-duplicate removal, in input order"""
+    kept = []
+    for enc in encodings:
+        if not kept or np.min(np.linalg.norm(np.array(kept) - enc, axis=1)) > dedup_distance:
+            kept.append(enc)
+    return np.array(kept)
+
+
+def k_medoids(points, k, iters=10):
+    """
+    Plain alternating k-medoids with farthest-point seeding (starting from
+    the point nearest the mean), so it is deterministic. Returns medoid rows.
+    """
+    if len(points) <= k:
+        return points
+    sq_norms = np.einsum("ij,ij->i", points, points)
+    dists = np.sqrt(np.maximum(_sq_dists(points, points, sq_norms), 0.0))
+    first = int(np.argmin(np.linalg.norm(points - points.mean(axis=0), axis=1)))
+    medoids = [first]
+    for _ in range(1, k):
+        medoids.append(int(np.argmax(dists[:, medoids].min(axis=1))))
+    medoids = np.array(medoids)
+
+    for _ in range(iters):
+        assign = np.argmin(dists[:, medoids], axis=1)
+        updated = medoids.copy()
+        for c in range(k):
+            members = np.flatnonzero(assign == c)
+            if len(members):
+                cost = dists[np.ix_(members, members)].sum(axis=1)
+                updated[c] = members[np.argmin(cost)]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+    return points[np.sort(medoids)]
+
+
+def compact_identity(encodings, max_prototypes=MAX_PROTOTYPES,
+                     dedup_distance=DEDUP_DISTANCE):
+    """(M, 128) encodings of one person -> (P, 128) prototypes, P <= max_prototypes"""
+    encodings = np.asarray(encodings, dtype=np.float64)
+    centroid = encodings.mean(axis=0, keepdims=True)
+    if max_prototypes <= 1:
+        return centroid
+    unique = dedupe(encodings, dedup_distance)
+    medoids = k_medoids(unique, max_prototypes - 1)
+    # a medoid that sits on the centroid adds nothing
+    medoids = medoids[np.linalg.norm(medoids - centroid, axis=1) > dedup_distance]
+    return np.vstack([centroid, medoids])
+
+
+def compact_gallery(data, max_prototypes=MAX_PROTOTYPES, dedup_distance=DEDUP_DISTANCE):
+    """
+    {'encodings', 'names'} -> compacted store of the same shape, identities
+    in sorted order. The result also carries 'compaction' stats.
+    """
+    matrix = np.asarray(data["encodings"], dtype=np.float64).reshape(-1, ENCODING_DIM)
+    names = list(data["names"])
+    rows = {}
+    for i, name in enumerate(names):
+        rows.setdefault(name, []).append(i)
+
+    encodings, out_names = [], []
+    for name in sorted(rows):
+        protos = compact_identity(matrix[rows[name]], max_prototypes, dedup_distance)
+        encodings.extend(protos)
+        out_names.extend([name] * len(protos))
+    return {
+        "encodings": encodings,
+        "names": out_names,
+        "compaction": {
+            "max_prototypes": max_prototypes,
+            "dedup_distance": dedup_distance,
+            "raw_count": len(names),
+            "count": len(out_names),
+        },
+    }
+
+
+def compaction_settings(gallery_dir=GALLERY_DIR):
+    """
+    (max_prototypes, dedup_distance, keep_raw) the current gallery was
+    written with, so incremental updates keep it compacted the same way.
+    (0, DEDUP_DISTANCE, False) for an uncompacted or missing gallery.
+    """
+    try:
+        header = read_header(gallery_dir)
+    except (OSError, ValueError):
+        header = None
+    compaction = (header or {}).get("compaction")
+    if not compaction:
+        return 0, DEDUP_DISTANCE, False
+    return (compaction["max_prototypes"],
+            compaction.get("dedup_distance", DEDUP_DISTANCE),
+            "raw_encodings_file" in header)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rewrite the gallery with a few prototypes per person")
+    parser.add_argument("--pickle", default=ENCODINGS_PATH,
+                        help="raw encodings to compact")
+    parser.add_argument("--gallery", default=GALLERY_DIR)
+    parser.add_argument("--prototypes", type=int, default=MAX_PROTOTYPES)
+    parser.add_argument("--dedup-distance", type=float, default=DEDUP_DISTANCE)
+    parser.add_argument("--keep-raw", action="store_true",
+                        help="store the raw encodings next to the gallery for audit")
+    args = parser.parse_args()
+
+    raw = load_pickle(args.pickle)
+    compacted = compact_gallery(raw, args.prototypes, args.dedup_distance)
+    header = save_gallery(compacted, args.gallery,
+                          raw=raw if args.keep_raw else None)
+    print(f"{len(raw['names'])} encodings -> {header['count']} prototypes for "
+          f"{len(header['identities'])} people (generation {header['generation']}).")
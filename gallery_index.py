@@ -0,0 +1,127 @@
+import numpy as np
+
+
+def _sq_dists(queries, rows, row_sq_norms):
+    """Squared euclidean distances between every query and every row"""
+    q_sq = np.einsum("ij,ij->i", queries, queries)
+    return q_sq[:, None] + row_sq_norms[None, :] - 2.0 * (queries @ rows.T)
+
+
+def kmeans(data, k, iters=10, seed=0):
+    """Plain Lloyd's k-means; returns (centroids, assignment)"""
+    rng = np.random.default_rng(seed)
+    k = max(1, min(k, len(data)))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    assign = np.zeros(len(data), dtype=np.intp)
+    for _ in range(iters):
+        c_sq = np.einsum("ij,ij->i", centroids, centroids)
+        assign = np.argmin(_sq_dists(data, centroids, c_sq), axis=1)
+        for c in range(k):
+            members = data[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+            else:
+                # re-seed empty clusters so every list stays useful
+                centroids[c] = data[rng.integers(len(data))]
+    return centroids, assign
+
+
+class BruteForceIndex:
+    """Exact scan over every gallery row"""
+
+    def __init__(self, matrix, labels=None):
+        self.matrix = matrix
+        self.sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+
+    def search(self, queries):
+        """Return the best gallery row per query (-1 if the gallery is empty)"""
+        if len(self.matrix) == 0:
+            return np.full(len(queries), -1, dtype=np.intp)
+        return np.argmin(_sq_dists(queries, self.matrix, self.sq_norms), axis=1)
+
+
+class _CandidateIndex:
+    """Shared search for indexes that shortlist groups of rows per query"""
+
+    n_probe = 1
+
+    def _build_groups(self, matrix, centroids, assign):
+        self.matrix = matrix
+        self.sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+        self.centroids = centroids
+        self.centroid_sq = np.einsum("ij,ij->i", centroids, centroids)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+        self.groups = [order[bounds[g]:bounds[g + 1]]
+                       for g in range(len(centroids))]
+
+    def search(self, queries):
+        best = np.full(len(queries), -1, dtype=np.intp)
+        if len(self.matrix) == 0:
+            return best
+        n_probe = min(self.n_probe, len(self.centroids))
+        c_dists = _sq_dists(queries, self.centroids, self.centroid_sq)
+        probes = np.argpartition(c_dists, n_probe - 1, axis=1)[:, :n_probe]
+        for i, probe in enumerate(probes):
+            rows = np.concatenate([self.groups[g] for g in probe])
+            if len(rows) == 0:
+                continue
+            dists = _sq_dists(queries[i:i + 1], self.matrix[rows],
+                              self.sq_norms[rows])[0]
+            best[i] = rows[np.argmin(dists)]
+        return best
+
+
+class CentroidIndex(_CandidateIndex):
+    """
+    Per-identity prefilter: compare against one mean encoding per person,
+    then scan only the rows of the n_probe closest people.
+    """
+
+    def __init__(self, matrix, labels, n_probe=3):
+        self.n_probe = n_probe
+        _, assign = np.unique(np.asarray(labels), return_inverse=True)
+        assign = assign.reshape(-1)
+        count = assign.max() + 1 if len(assign) else 0
+        centroids = np.zeros((count, matrix.shape[1]), dtype=matrix.dtype)
+        np.add.at(centroids, assign, matrix)
+        centroids /= np.maximum(np.bincount(assign, minlength=count), 1)[:, None]
+        self._build_groups(matrix, centroids, assign)
+
+
+class IVFIndex(_CandidateIndex):
+    """
+    Inverted-file ANN: k-means partitions the gallery into n_lists cells and
+    a query only scans the n_probe nearest cells.
+    """
+
+    def __init__(self, matrix, labels=None, n_lists=None, n_probe=8,
+                 iters=10, train_size=50000, seed=0):
+        self.n_probe = n_probe
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(len(matrix))))
+        if len(matrix) == 0:
+            self._build_groups(matrix, matrix[:0], np.zeros(0, dtype=np.intp))
+            return
+        rng = np.random.default_rng(seed)
+        train = matrix
+        if len(matrix) > train_size:
+            train = matrix[rng.choice(len(matrix), train_size, replace=False)]
+        centroids, _ = kmeans(train, n_lists, iters=iters, seed=seed)
+        c_sq = np.einsum("ij,ij->i", centroids, centroids)
+        assign = np.argmin(_sq_dists(matrix, centroids, c_sq), axis=1)
+        self._build_groups(matrix, centroids, assign)
+
+
+INDEXES = {
+    "brute": BruteForceIndex,
+    "centroid": CentroidIndex,
+    "ivf": IVFIndex,
+}
+
+
+def build_index(kind, matrix, labels, **kwargs):
+    if kind not in INDEXES:
+        raise ValueError(
+            f"Unknown gallery index '{kind}' (choose from {', '.join(INDEXES)})")
+    return INDEXES[kind](matrix, labels, **kwargs)
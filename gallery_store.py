@@ -0,0 +1,217 @@
+"""
+On-disk gallery layout (GALLERY_DIR):
+
+    header.json            format/version, dim, count, dtype, model, generation
+                           and the names of the two data files below
+    encodings-<gen>.npy    (count, dim) float32 matrix, opened with mmap
+    ids-<gen>.npy          (count,) uint32 row -> identity index
+    header["identities"]   identity index -> user name
+    raw-<gen>.npy,         optional: the uncompacted encodings and their
+    raw-ids-<gen>.npy      identity ids, kept for audit when the gallery
+                           holds prototypes (see gallery_compact.py)
+
+Data files carry the generation number and header.json is replaced last, so
+a reader either sees the previous complete gallery or the new one. The
+previous generation's files are kept one more save, so a reader that read
+the old header just before the swap can still open its files; anything
+older is swept on every save (including files a Windows reader still had
+mapped when an earlier sweep tried).
+"""
+import os
+import re
+import json
+import pickle
+import argparse
+
+import numpy as np
+
+
+ENCODINGS_PATH = os.path.join("encodings", "face_encodings.pkl")
+GALLERY_DIR = os.path.join("encodings", "gallery")
+HEADER_NAME = "header.json"
+DATA_FILE_RE = re.compile(r"^(?:encodings|ids|raw|raw-ids)-(\d+)\.npy$")
+
+FORMAT_NAME = "smart-attendance-gallery"
+FORMAT_VERSION = 1
+MODEL_VERSION = "dlib_face_recognition_resnet_model_v1"
+ENCODING_DIM = 128
+
+
+def _atomic_write_json(data, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def read_header(gallery_dir=GALLERY_DIR):
+    """Return the gallery header dict, or None if there is no valid gallery"""
+    path = os.path.join(gallery_dir, HEADER_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT_NAME:
+        raise ValueError(f"{path} is not a gallery header")
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(
+            f"{path} uses gallery format v{header['version']}, "
+            f"this build reads up to v{FORMAT_VERSION}")
+    return header
+
+
+def _matrix_and_names(data, dtype):
+    matrix = np.asarray(data["encodings"], dtype=dtype).reshape(-1, ENCODING_DIM)
+    names = list(data["names"])
+    if len(names) != len(matrix):
+        raise ValueError(f"{len(matrix)} encodings but {len(names)} names")
+    return matrix, names
+
+
+def save_gallery(data, gallery_dir=GALLERY_DIR, dtype=np.float32, raw=None):
+    """
+    Write the {'encodings', 'names'} store as a new gallery generation.
+    `raw` (same shape, e.g. the uncompacted store) is saved alongside for
+    audit; `data['compaction']`, if present, is recorded in the header.
+    """
+    os.makedirs(gallery_dir, exist_ok=True)
+    matrix, names = _matrix_and_names(data, dtype)
+    raw_matrix, raw_names = (None, []) if raw is None else _matrix_and_names(raw, dtype)
+
+    identities = sorted(set(names) | set(raw_names))
+    lookup = {name: i for i, name in enumerate(identities)}
+    ids = np.array([lookup[n] for n in names], dtype=np.uint32)
+
+    try:
+        previous = read_header(gallery_dir)
+    except ValueError:
+        previous = None
+    generation = previous["generation"] + 1 if previous else 1
+
+    header = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "model": MODEL_VERSION,
+        "generation": generation,
+        "dim": ENCODING_DIM,
+        "count": len(matrix),
+        "dtype": np.dtype(dtype).str,
+        "encodings_file": f"encodings-{generation}.npy",
+        "ids_file": f"ids-{generation}.npy",
+        "identities": identities,
+    }
+    if data.get("compaction"):
+        header["compaction"] = data["compaction"]
+    np.save(os.path.join(gallery_dir, header["encodings_file"]), matrix)
+    np.save(os.path.join(gallery_dir, header["ids_file"]), ids)
+    if raw is not None:
+        header["raw_encodings_file"] = f"raw-{generation}.npy"
+        header["raw_ids_file"] = f"raw-ids-{generation}.npy"
+        np.save(os.path.join(gallery_dir, header["raw_encodings_file"]), raw_matrix)
+        np.save(os.path.join(gallery_dir, header["raw_ids_file"]),
+                np.array([lookup[n] for n in raw_names], dtype=np.uint32))
+    _atomic_write_json(header, os.path.join(gallery_dir, HEADER_NAME))
+    _sweep(gallery_dir, {generation, previous["generation"] if previous else generation})
+    return header
+
+
+def _sweep(gallery_dir, keep):
+    """Remove data files of every generation not in `keep`"""
+    for fname in os.listdir(gallery_dir):
+        m = DATA_FILE_RE.match(fname)
+        if m is None or int(m.group(1)) in keep:
+            continue
+        try:
+            os.remove(os.path.join(gallery_dir, fname))
+        except OSError:
+            # still mapped by a reader on Windows; the next save sweeps again
+            pass
+
+
+def open_gallery(gallery_dir=GALLERY_DIR):
+    """
+    Map the gallery read-only. Returns {'encodings': (N, 128) memmap,
+    'names': [...], 'header': {...}} or None if there is no gallery.
+    """
+    header = read_header(gallery_dir)
+    if header is None:
+        return None
+    if header["dim"] != ENCODING_DIM:
+        raise ValueError(
+            f"Gallery has {header['dim']}-d encodings, expected {ENCODING_DIM}")
+    matrix = np.load(os.path.join(gallery_dir, header["encodings_file"]),
+                     mmap_mode="r")
+    ids = np.load(os.path.join(gallery_dir, header["ids_file"]))
+    identities = header["identities"]
+    return {
+        "encodings": matrix,
+        "names": [identities[i] for i in ids],
+        "header": header,
+    }
+
+
+def open_raw_gallery(gallery_dir=GALLERY_DIR):
+    """The audit copy of the uncompacted encodings, or None if not kept"""
+    header = read_header(gallery_dir)
+    if header is None or "raw_encodings_file" not in header:
+        return None
+    matrix = np.load(os.path.join(gallery_dir, header["raw_encodings_file"]),
+                     mmap_mode="r")
+    ids = np.load(os.path.join(gallery_dir, header["raw_ids_file"]))
+    identities = header["identities"]
+    return {
+        "encodings": matrix,
+        "names": [identities[i] for i in ids],
+        "header": header,
+    }
+
+
+def load_pickle(pickle_path=ENCODINGS_PATH):
+    """Read the legacy {'encodings': [arrays], 'names': [...]} pickle"""
+    with open(pickle_path, "rb") as f:
+        data = pickle.load(f)
+    matrix = np.asarray(data["encodings"], dtype=np.float64).reshape(-1, ENCODING_DIM)
+    return {"encodings": matrix, "names": list(data["names"]), "header": None}
+
+
+def gallery_version(gallery_dir=GALLERY_DIR, pickle_path=ENCODINGS_PATH):
+    """
+    Cheap token that changes whenever load_gallery() would return something
+    new: the header generation, else the pickle's mtime; None if neither.
+    """
+    try:
+        header = read_header(gallery_dir)
+    except (OSError, ValueError):
+        header = None
+    if header is not None:
+        return ("gallery", header["generation"])
+    try:
+        return ("pickle", os.stat(pickle_path).st_mtime_ns)
+    except OSError:
+        return None
+
+
+def load_gallery(gallery_dir=GALLERY_DIR, pickle_path=ENCODINGS_PATH):
+    """Open the mmap gallery, falling back to the pickle; None if neither exists"""
+    try:
+        gallery = open_gallery(gallery_dir)
+        if gallery is not None:
+            return gallery
+    except (OSError, ValueError) as e:
+        print(f"Gallery at {gallery_dir} unusable ({e}); trying {pickle_path}")
+    if os.path.exists(pickle_path):
+        return load_pickle(pickle_path)
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Migrate face_encodings.pkl to the memory-mapped gallery format")
+    parser.add_argument("--pickle", default=ENCODINGS_PATH)
+    parser.add_argument("--out", default=GALLERY_DIR)
+    args = parser.parse_args()
+
+    data = load_pickle(args.pickle)
+    header = save_gallery(data, args.out)
+    print(f"Wrote {header['count']} encodings for {len(header['identities'])} "
+          f"people to {args.out} (generation {header['generation']}).")
@@ -0,0 +1,77 @@
+"""
+Hot reload of the gallery for a running recognizer.
+
+GalleryWatcher polls gallery_store.gallery_version() (the header generation,
+or the pickle's mtime) on a background thread. When it moves, the new
+matcher is built on that thread and handed to `on_swap`, typically
+Recognizer.set_matcher. Frames being recognized meanwhile keep using the old
+matcher; nothing on the capture or recognition path waits for the load.
+save_gallery() replaces header.json last, so a new generation is only seen
+once its data files are complete.
+"""
+import threading
+import time
+
+from gallery_store import ENCODINGS_PATH, GALLERY_DIR, gallery_version
+
+
+POLL_SECONDS = 2.0
+
+
+class GalleryWatcher:
+    """
+    `load()` builds the matcher (or returns None if there is no gallery);
+    `on_swap(matcher)` receives each newly loaded one, and None once the
+    gallery has been emptied (the last person deleted). `version` is the
+    version the caller already has loaded, so startup does not reload.
+    """
+
+    def __init__(self, load, on_swap, version=None, interval=POLL_SECONDS,
+                 gallery_dir=GALLERY_DIR, pickle_path=ENCODINGS_PATH):
+        self.load = load
+        self.on_swap = on_swap
+        self.version = version
+        self.interval = interval
+        self.gallery_dir = gallery_dir
+        self.pickle_path = pickle_path
+        self.reloads = 0
+        self.last_load_ms = 0.0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="gallery-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def check(self):
+        """Reload if the gallery changed; True if a new matcher was swapped in"""
+        version = gallery_version(self.gallery_dir, self.pickle_path)
+        if version is None or version == self.version:
+            return False
+        start = time.perf_counter()
+        try:
+            matcher = self.load()
+        except Exception as e:
+            # e.g. files removed between the version check and the load;
+            # the version is not recorded, so the next tick retries
+            self.last_error = e
+            print(f"Gallery reload failed: {e}")
+            return False
+        self.version = version
+        self.last_load_ms = 1000 * (time.perf_counter() - start)
+        self.reloads += 1
+        self.on_swap(matcher)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
@@ -0,0 +1,77 @@
+import numpy as np
+
+from gallery_index import build_index
+
+
+ENCODING_DIM = 128
+DEFAULT_TOLERANCE = 0.5
+
+
+class FaceMatcher:
+    """
+    Known-face gallery held as one contiguous (N, 128) matrix.
+
+    The squared norms of the gallery rows are computed once by the index, so
+    matching a whole frame's worth of faces is a single matrix product:
+        |q - g|^2 = |q|^2 + |g|^2 - 2 q.g
+    The winning distance is then recomputed exactly, so the tolerance check
+    gives the same answer as face_recognition.compare_faces/face_distance.
+
+    `index` selects how the best row is found (see gallery_index.INDEXES):
+    "brute" is exact, "centroid" and "ivf" trade a little recall for
+    scanning only part of a large gallery.
+    """
+
+    def __init__(self, encodings, names, tolerance=DEFAULT_TOLERANCE, dtype=np.float64,
+                 index="brute", **index_kwargs):
+        self.dtype = np.dtype(dtype)
+        self.tolerance = tolerance
+        self.names = list(names)
+        self.matrix = np.ascontiguousarray(
+            np.asarray(encodings, dtype=self.dtype).reshape(-1, ENCODING_DIM))
+
+        if len(self.names) != len(self.matrix):
+            raise ValueError(
+                f"{len(self.matrix)} encodings but {len(self.names)} names")
+
+        self.index = build_index(index, self.matrix, self.names, **index_kwargs)
+
+    @classmethod
+    def from_known_data(cls, data, **kwargs):
+        """
+        Build from the {'encodings', 'names'} gallery dict. A gallery matrix
+        keeps its own dtype, so a float32 memmap is used without copying.
+        """
+        kwargs.setdefault("dtype", getattr(
+            data["encodings"], "dtype", np.float64))
+        return cls(data["encodings"], data["names"], **kwargs)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def match(self, face_encodings):
+        """
+        Match an (M, 128) block of encodings against the gallery.
+        Returns (best_idx, best_dist) arrays of length M; best_idx is -1 when
+        the gallery is empty.
+        """
+        queries = np.asarray(face_encodings, dtype=self.dtype).reshape(-1, ENCODING_DIM)
+        count = len(queries)
+        if count == 0 or len(self.matrix) == 0:
+            return np.full(count, -1, dtype=np.intp), np.full(count, np.inf)
+
+        best_idx = self.index.search(queries)
+        best_dist = np.linalg.norm(self.matrix[best_idx] - queries, axis=1)
+        best_dist[best_idx < 0] = np.inf
+        return best_idx, best_dist
+
+    def identify(self, face_encodings):
+        """Return a name per encoding, 'Unknown' when no match is within tolerance"""
+        return self.names_for(*self.match(face_encodings))
+
+    def names_for(self, best_idx, best_dist):
+        """Turn match() output into names"""
+        return [
+            self.names[idx] if idx >= 0 and dist <= self.tolerance else "Unknown"
+            for idx, dist in zip(best_idx, best_dist)
+        ]
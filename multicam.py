@@ -0,0 +1,355 @@
+"""
+Multi-camera ingest: one capture thread per source, one shared pool of
+recognition workers.
+
+    python multicam.py --source 0 --source rtsp://cam2/stream --workers 2
+    python multicam.py --source synthetic --source synthetic --source test.mp4
+
+Each camera keeps only its newest unprocessed frame. Workers take cameras
+from a round-robin ready queue and a camera is never handed to two workers
+at once, so a fast or busy entrance cannot starve the others and per-camera
+state (the hold-still rule) needs no locking. Frames a camera produced while
+it was waiting for a worker are counted as dropped.
+"""
+import argparse
+import threading
+import time
+from collections import deque
+
+from adaptive import AdaptiveController
+from detectors import build_detector
+from pipeline import LatestQueue, StageTimer
+from recognizer import HoldStill, Recognizer
+from sources import open_source
+
+
+RECONNECT_AFTER = 50      # consecutive failed reads before reopening a source
+RECONNECT_DELAY = 2.0
+
+
+class CameraFeed:
+    """Capture side and statistics of one source"""
+
+    def __init__(self, camera_id, spec):
+        self.camera_id = camera_id
+        self.spec = spec
+        self.source = None
+
+        self.capture_timer = StageTimer()
+        self.recognition_timer = StageTimer()
+        self.latency_timer = StageTimer()
+        self.result_queue = LatestQueue(2)
+
+        self.frames = 0
+        self.dropped = 0
+        self.read_failures = 0
+        self.reconnects = 0
+        self.last_error = None
+
+        # guarded by the server's condition
+        self.pending = None
+        self.busy = False
+        self.queued = False
+
+        self._frame_lock = threading.Lock()
+        self._frame = None
+
+    def latest_frame(self):
+        """Return (frame_id, captured_at, frame) for the newest frame, or None"""
+        with self._frame_lock:
+            return self._frame
+
+    def latest_result(self):
+        return self.result_queue.get_latest()
+
+    def stats(self):
+        return {
+            "capture": self.capture_timer.snapshot(),
+            "recognition": self.recognition_timer.snapshot(),
+            "latency": self.latency_timer.snapshot(),
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "read_failures": self.read_failures,
+            "reconnects": self.reconnects,
+        }
+
+
+class MultiCameraServer:
+    """
+    Runs `process_frame(camera_id, frame)` for a list of sources on a
+    shared pool of `workers` threads. `sources` is a list of open_source()
+    specs or a dict {camera_id: spec}. `on_result(feed, result)` is called on
+    the worker thread after each frame; results are also kept on each feed
+    for pollers (feed.latest_result()).
+    """
+
+    def __init__(self, sources, process_frame, workers=2, on_result=None,
+                 opener=open_source):
+        if not isinstance(sources, dict):
+            sources = {f"cam{i}": spec for i, spec in enumerate(sources)}
+        self.feeds = {cid: CameraFeed(cid, spec) for cid, spec in sources.items()}
+        self.process_frame = process_frame
+        self.workers = max(1, workers)
+        self.on_result = on_result
+        self.opener = opener
+
+        self._ready = deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._capture_threads = {}
+
+    # Lifecycle
+
+    def start(self):
+        self._stop.clear()
+        self._threads = []
+        self._capture_threads = {}
+        for feed in self.feeds.values():
+            feed.source = self.opener(feed.spec)
+            t = threading.Thread(
+                target=self._capture_loop, args=(feed,),
+                name=f"capture-{feed.camera_id}", daemon=True)
+            self._capture_threads[feed.camera_id] = t
+            self._threads.append(t)
+        for i in range(self.workers):
+            self._threads.append(threading.Thread(
+                target=self._worker_loop, name=f"recognition-{i}", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        with self._cond:
+            self._ready.clear()
+            for feed in self.feeds.values():
+                feed.pending = None
+                feed.busy = feed.queued = False
+        # a started capture thread releases its own source once read()
+        # returns, even if that outlasts the join timeout
+        for feed in self.feeds.values():
+            t = self._capture_threads.get(feed.camera_id)
+            if t is not None and t.ident is not None:
+                continue
+            if feed.source is not None:
+                feed.source.release()
+                feed.source = None
+        self._capture_threads = {}
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    # Capture
+
+    def _reopen(self, feed):
+        if feed.source is not None:
+            feed.source.release()
+            feed.source = None
+        if self._stop.wait(RECONNECT_DELAY):
+            return
+        feed.source = self.opener(feed.spec)
+        feed.reconnects += 1
+
+    def _capture_loop(self, feed):
+        frame_id = 0
+        failures = 0
+        source = feed.source
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                ret, frame = source.read()
+                if not ret:
+                    feed.read_failures += 1
+                    failures += 1
+                    if failures >= RECONNECT_AFTER:
+                        failures = 0
+                        self._reopen(feed)
+                        source = feed.source
+                    else:
+                        time.sleep(0.01)
+                    continue
+                failures = 0
+                captured_at = time.perf_counter()
+                feed.capture_timer.add(captured_at - start)
+
+                frame_id += 1
+                packet = (frame_id, captured_at, frame)
+                with feed._frame_lock:
+                    feed._frame = packet
+                self._offer(feed, packet)
+        finally:
+            # released here, never under a read() still in progress; a
+            # restart may already have put a new source on the feed
+            if source is not None:
+                source.release()
+            if feed.source is source:
+                feed.source = None
+
+    def _offer(self, feed, packet):
+        with self._cond:
+            feed.frames += 1
+            if feed.pending is not None:
+                feed.dropped += 1
+            feed.pending = packet
+            if not feed.busy and not feed.queued:
+                feed.queued = True
+                self._ready.append(feed)
+                self._cond.notify()
+
+    # Recognition
+
+    def _take(self):
+        """Next camera in round-robin order, marked busy, with its frame"""
+        with self._cond:
+            while not self._ready:
+                if self._stop.is_set():
+                    return None, None
+                self._cond.wait(0.1)
+            feed = self._ready.popleft()
+            feed.queued = False
+            feed.busy = True
+            packet, feed.pending = feed.pending, None
+            return feed, packet
+
+    def _release(self, feed):
+        with self._cond:
+            feed.busy = False
+            if feed.pending is not None and not feed.queued:
+                # back of the line: cameras that waited go first
+                feed.queued = True
+                self._ready.append(feed)
+                self._cond.notify()
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            feed, packet = self._take()
+            if feed is None:
+                continue
+            frame_id, captured_at, frame = packet
+            try:
+                start = time.perf_counter()
+                result = self.process_frame(feed.camera_id, frame)
+                done = time.perf_counter()
+                feed.recognition_timer.add(done - start)
+                feed.latency_timer.add(done - captured_at)
+                packet = {
+                    "camera_id": feed.camera_id,
+                    "frame_id": frame_id,
+                    "captured_at": captured_at,
+                    "latency": done - captured_at,
+                    "result": result,
+                }
+                feed.result_queue.put(packet)
+                if self.on_result is not None:
+                    self.on_result(feed, packet)
+            except Exception as e:
+                feed.last_error = e
+                print(f"Recognition error ({feed.camera_id}): {e}")
+            finally:
+                self._release(feed)
+
+    # Reporting
+
+    def stats(self):
+        return {cid: feed.stats() for cid, feed in self.feeds.items()}
+
+    def format_stats(self):
+        lines = [f"{'camera':<10}{'cap fps':>8}{'rec fps':>8}{'rec ms':>8}"
+                 f"{'lat ms':>8}{'lat max':>8}{'dropped':>9}{'fails':>7}"]
+        for cid, s in self.stats().items():
+            lines.append(
+                f"{cid:<10}{s['capture']['fps']:>8.1f}{s['recognition']['fps']:>8.1f}"
+                f"{s['recognition']['avg_ms']:>8.1f}{s['latency']['avg_ms']:>8.1f}"
+                f"{s['latency']['max_ms']:>8.1f}{s['dropped']:>9}{s['read_failures']:>7}")
+        return "\n".join(lines)
+
+
+class MultiCameraAttendance:
+    """
+    Marks attendance from every camera in `camera_ids`. Each camera gets its
+    own face tracker and hold-still state, built up front so the workers never
+    change the dicts the stats loop reads; the gallery matcher is shared.
+    """
+
+    def __init__(self, matcher, store, camera_ids, detector="hog"):
+        self.matcher = matcher
+        self.store = store
+        self.detector = detector
+        self._recognizers = {
+            cid: Recognizer(matcher, tracker=True,
+                            controller=AdaptiveController(),
+                            detector=build_detector(detector))
+            for cid in camera_ids}
+        self._holds = {cid: HoldStill() for cid in camera_ids}
+
+    def __call__(self, camera_id, frame):
+        faces = self._recognizers[camera_id](frame)
+        hold = self._holds[camera_id]
+        state, name = hold.update(faces)
+        if state == "ready":
+            marked, time_str = self.store.mark(name)
+            hold.reset()
+            if marked:
+                print(f"[{camera_id}] {name} marked at {time_str}")
+        return faces
+
+    def format_controllers(self):
+        """One line per camera with the adaptive detection settings"""
+        lines = []
+        for cid, recognizer in sorted(self._recognizers.items()):
+            m = recognizer.controller.metrics()
+            lines.append(
+                f"{cid:<10}scale {m['scale']:.2f} upsample {m['upsample']} "
+                f"stride {m['stride']} detect {m['detect_ms']:.0f} ms "
+                f"encoded {100 * recognizer.encode_ratio():.0f}%")
+        return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-camera attendance server")
+    parser.add_argument("--source", action="append", required=True,
+                        help="camera index, stream URL, video file or 'synthetic'"
+                             " (repeat for each camera)")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="recognition threads shared by all cameras")
+    parser.add_argument("--stats-every", type=float, default=5.0)
+    parser.add_argument("--index", default="brute",
+                        help="gallery index: brute, centroid or ivf")
+    parser.add_argument("--detector", default="hog",
+                        help="face detector: hog, haar or dnn")
+    args = parser.parse_args()
+
+    from attendance_store import AttendanceStore
+    from gallery_store import GALLERY_DIR, ENCODINGS_PATH, load_gallery
+    from matcher import FaceMatcher
+
+    data = load_gallery(GALLERY_DIR, ENCODINGS_PATH)
+    if data is None or len(data["names"]) == 0:
+        parser.error("no encodings found; register faces first")
+    matcher = FaceMatcher.from_known_data(data, index=args.index)
+    store = AttendanceStore()
+
+    sources = {f"cam{i}": spec for i, spec in enumerate(args.source)}
+    attendance = MultiCameraAttendance(matcher, store, sources, args.detector)
+    server = MultiCameraServer(sources, attendance, workers=args.workers)
+    server.start()
+    try:
+        while True:
+            time.sleep(args.stats_every)
+            print(server.format_stats())
+            print(attendance.format_controllers(), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
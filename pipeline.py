@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import deque
+
+
+class LatestQueue:
+    """Bounded queue that drops the oldest item instead of blocking the producer"""
+
+    def __init__(self, maxsize=1):
+        self.maxsize = max(1, maxsize)
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest item, or None if nothing arrived within timeout"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def get_latest(self):
+        """Drain the queue and return only the newest item (or None)"""
+        with self._cond:
+            if not self._items:
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            self._items.clear()
+            return item
+
+    def qsize(self):
+        with self._cond:
+            return len(self._items)
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+
+class StageTimer:
+    """Rolling latency / throughput figures for one pipeline stage"""
+
+    def __init__(self, window=60):
+        self.count = 0
+        self._durations = deque(maxlen=window)
+        self._stamps = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.count += 1
+            self._durations.append(seconds)
+            self._stamps.append(time.perf_counter())
+
+    def snapshot(self):
+        with self._lock:
+            durations = list(self._durations)
+            stamps = list(self._stamps)
+            count = self.count
+        if not durations:
+            return {"count": count, "avg_ms": 0.0, "max_ms": 0.0, "fps": 0.0}
+        fps = 0.0
+        if len(stamps) > 1 and stamps[-1] > stamps[0]:
+            fps = (len(stamps) - 1) / (stamps[-1] - stamps[0])
+        return {
+            "count": count,
+            "avg_ms": 1000.0 * sum(durations) / len(durations),
+            "max_ms": 1000.0 * max(durations),
+            "fps": fps,
+        }
+
+
+class RecognitionPipeline:
+    """
+    Capture -> recognition -> render pipeline.
+
+    A capture thread reads frames from `source` (anything with read() and
+    release(), e.g. cv2.VideoCapture) as fast as the camera delivers them and
+    keeps the newest one for display. Frames are also offered to a recognition
+    worker through a drop-oldest queue, so a slow `process_frame(frame)` call
+    never holds back the preview. The GUI only reads latest_frame() and
+    latest_result(); it never waits on either thread.
+    """
+
+    def __init__(self, source, process_frame, frame_queue_size=1, result_queue_size=2):
+        self.source = source
+        self.process_frame = process_frame
+
+        self.frame_queue = LatestQueue(frame_queue_size)
+        self.result_queue = LatestQueue(result_queue_size)
+
+        self.capture_timer = StageTimer()
+        self.recognition_timer = StageTimer()
+        self.render_timer = StageTimer()
+
+        self.read_failures = 0
+        self.last_error = None
+
+        self._frame_lock = threading.Lock()
+        self._frame = None
+        self._frame_id = 0
+        self._stop = threading.Event()
+        self._threads = []
+
+    # Lifecycle
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop,
+                             name="capture", daemon=True),
+            threading.Thread(target=self._recognition_loop,
+                             name="recognition", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout=2.0):
+        started = bool(self._threads)
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        self.frame_queue.clear()
+        self.result_queue.clear()
+        if not started and self.source is not None:
+            # otherwise the capture thread releases it once read() returns,
+            # even if that outlasts the join timeout
+            self.source.release()
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    # Worker loops
+
+    def _capture_loop(self):
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                ret, frame = self.source.read()
+                if not ret:
+                    self.read_failures += 1
+                    time.sleep(0.01)
+                    continue
+                captured_at = time.perf_counter()
+                self.capture_timer.add(captured_at - start)
+
+                with self._frame_lock:
+                    self._frame_id += 1
+                    packet = (self._frame_id, captured_at, frame)
+                    self._frame = packet
+                self.frame_queue.put(packet)
+        finally:
+            # released here, never under a read() still in progress
+            if self.source is not None:
+                self.source.release()
+
+    def _recognition_loop(self):
+        while not self._stop.is_set():
+            packet = self.frame_queue.get(timeout=0.1)
+            if packet is None:
+                continue
+            frame_id, captured_at, frame = packet
+            start = time.perf_counter()
+            try:
+                result = self.process_frame(frame)
+            except Exception as e:
+                self.last_error = e
+                print(f"Recognition error: {e}")
+                continue
+            done = time.perf_counter()
+            self.recognition_timer.add(done - start)
+            self.result_queue.put({
+                "frame_id": frame_id,
+                "captured_at": captured_at,
+                "latency": done - captured_at,
+                "result": result,
+            })
+
+    # Consumer side
+
+    def latest_frame(self):
+        """Return (frame_id, captured_at, frame) for the newest frame, or None"""
+        with self._frame_lock:
+            return self._frame
+
+    def latest_result(self):
+        """Return the newest recognition result dict, or None if nothing new"""
+        return self.result_queue.get_latest()
+
+    def stats(self):
+        return {
+            "capture": self.capture_timer.snapshot(),
+            "recognition": self.recognition_timer.snapshot(),
+            "render": self.render_timer.snapshot(),
+            "frame_queue_depth": self.frame_queue.qsize(),
+            "frame_queue_dropped": self.frame_queue.dropped,
+            "result_queue_depth": self.result_queue.qsize(),
+            "read_failures": self.read_failures,
+        }
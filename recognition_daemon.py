@@ -0,0 +1,334 @@
+"""
+Long-lived recognition process for the dashboard.
+
+Launching app.py or register_face.py from scratch imports cv2 and
+face_recognition (which loads the dlib models) and reads the gallery before
+the camera even opens. The daemon does that once and then opens the
+attendance / registration windows on request, in its own Tk loop. The
+gallery is re-read only when its generation (or the pickle's mtime) moved.
+
+Requests are dicts sent over a multiprocessing.connection socket on
+localhost (port DAEMON_PORT, or $ATTENDANCE_DAEMON_PORT), authenticated
+with the key in DAEMON_KEY_PATH:
+
+    {"cmd": "ping"}                        -> {"ok": True, "pid": ...}
+    {"cmd": "warm"}                        -> {"ok": True, "faces": n, "load_ms": ...}
+    {"cmd": "open", "window": "attendance" or "register", "source": "0"}
+                                           -> {"ok": True}, later {"closed": True}
+    {"cmd": "shutdown"}                    -> {"ok": True}
+
+This module only imports the standard library at the top, so dashboard.py
+can use DaemonClient without paying for the heavy imports itself.
+
+    python recognition_daemon.py             # normally started by dashboard.py
+    python recognition_daemon.py --no-gui    # no windows (benchmarks)
+    python recognition_daemon.py --port 47700
+"""
+import os
+import sys
+import time
+import queue
+import argparse
+import secrets
+import subprocess
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import (Client, Listener, answer_challenge,
+                                        deliver_challenge)
+
+
+DAEMON_PORT = int(os.environ.get("ATTENDANCE_DAEMON_PORT", 47631))
+DAEMON_ADDRESS = ("127.0.0.1", DAEMON_PORT)
+DAEMON_KEY_PATH = os.path.join("cache", "daemon.key")
+START_TIMEOUT = 60.0
+RECV_TIMEOUT = 10.0
+POLL_MS = 50
+WINDOWS = ("attendance", "register")
+
+
+def daemon_key(path=DAEMON_KEY_PATH):
+    """Shared secret for the daemon socket, created (owner-only) on first use"""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    key = secrets.token_hex(16).encode("ascii")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    try:
+        # whoever links first wins; everyone then reads the same key
+        os.link(tmp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp_path)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _send(conn, msg):
+    try:
+        conn.send(msg)
+    except (OSError, EOFError):
+        pass
+
+
+class DaemonClient:
+    """Talks to (and if need be starts) the recognition daemon"""
+
+    def __init__(self, address=DAEMON_ADDRESS, key_path=DAEMON_KEY_PATH):
+        self.address = address
+        self.key_path = key_path
+        self.process = None
+        self.last_error = None
+
+    def connect(self, timeout=0.0):
+        """
+        Authenticated connection, retrying for `timeout` seconds while the
+        daemon starts; None if unreachable. A failed handshake means the port
+        belongs to some other daemon (another install or user), which no
+        amount of waiting fixes, so that gives up at once.
+        """
+        deadline = time.monotonic() + timeout
+        key = daemon_key(self.key_path)
+        while True:
+            try:
+                return Client(self.address, authkey=key)
+            except AuthenticationError as e:
+                self.last_error = e
+                print(f"Port {self.address[1]} is held by another daemon "
+                      f"(authentication failed); set ATTENDANCE_DAEMON_PORT")
+                return None
+            except (OSError, EOFError) as e:
+                self.last_error = e
+                if time.monotonic() >= deadline:
+                    return None
+                if self.process is not None and self.process.poll() is not None:
+                    return None  # the daemon we started has exited
+                time.sleep(0.1)
+
+    def request(self, msg, timeout=0.0):
+        """Send one request and return the reply, or None if there is no daemon"""
+        conn = self.connect(timeout)
+        if conn is None:
+            return None
+        try:
+            conn.send(msg)
+            return conn.recv()
+        except (OSError, EOFError):
+            return None
+        finally:
+            conn.close()
+
+    def ping(self):
+        return self.request({"cmd": "ping"})
+
+    def start(self, gui=True):
+        """Start a daemon in the background unless one answers already"""
+        if self.ping() is not None:
+            return False
+        if isinstance(self.last_error, AuthenticationError):
+            return False  # a foreign daemon holds the port; ours could not bind
+        args = [sys.executable, os.path.abspath(__file__),
+                "--port", str(self.address[1])]
+        if not gui:
+            args.append("--no-gui")
+        self.process = subprocess.Popen(args)
+        return True
+
+    def open_window(self, window, source="0", timeout=START_TIMEOUT):
+        """
+        Ask the daemon to open a window. Returns the connection, on which
+        {"closed": True} arrives when the window is closed, or None if no
+        daemon answered within `timeout`. Raises RuntimeError if it refused.
+        """
+        conn = self.connect(timeout)
+        if conn is None:
+            return None
+        try:
+            conn.send({"cmd": "open", "window": window, "source": source})
+            reply = conn.recv()
+        except (OSError, EOFError):
+            conn.close()
+            return None
+        if not reply.get("ok"):
+            conn.close()
+            raise RuntimeError(reply.get("error", "daemon refused the request"))
+        return conn
+
+    def stop(self, timeout=5.0):
+        """Shut down the daemon if this client started it"""
+        if self.process is None:
+            return
+        self.request({"cmd": "shutdown"})
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.process = None
+
+
+class RecognitionDaemon:
+    """
+    Accepts connections on a background thread, reads each request on a
+    thread of its own (so a stalled client holds up nobody else) and
+    handles them on the main thread, which owns Tk (a hidden root; each
+    window is a Toplevel).
+    """
+
+    def __init__(self, address=DAEMON_ADDRESS, authkey=None, gui=True):
+        # the handshake is done per connection in _receive, not by accept()
+        self.listener = Listener(address)
+        self.authkey = authkey or daemon_key()
+        self.gui = gui
+        self.requests = queue.Queue()
+        self.matcher = None
+        self.version = None
+        self.load_ms = 0.0
+        self.root = None
+        self.running = True
+        self._thread = threading.Thread(
+            target=self._accept_loop, name="daemon-accept", daemon=True)
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return  # listener closed
+            threading.Thread(target=self._receive, args=(conn,),
+                             name="daemon-conn", daemon=True).start()
+
+    def _receive(self, conn):
+        try:
+            # a client that stalls here only holds up this thread
+            deliver_challenge(conn, self.authkey)
+            answer_challenge(conn, self.authkey)
+            if not conn.poll(RECV_TIMEOUT):
+                conn.close()
+                return
+            msg = conn.recv()
+        except (OSError, EOFError, AuthenticationError):
+            conn.close()
+            return
+        self.requests.put((msg, conn))
+
+    def warm(self):
+        """Import the heavy modules once and (re)load the gallery if it changed"""
+        # deliberately lazy: these are what the daemon exists to keep loaded
+        import app
+        import register_face  # noqa: F401  (encoder, dlib models)
+        from gallery_store import gallery_version
+
+        version = gallery_version()
+        if self.matcher is None or version != self.version:
+            start = time.perf_counter()
+            self.matcher = app.load_matcher()
+            self.version = version
+            self.load_ms = 1000 * (time.perf_counter() - start)
+        return {"ok": True, "faces": len(self.matcher) if self.matcher else 0,
+                "load_ms": self.load_ms}
+
+    def handle(self, msg, conn):
+        cmd = msg.get("cmd") if isinstance(msg, dict) else None
+        try:
+            if cmd == "open":
+                # the connection stays open until the window closes
+                self.open_window(msg, conn)
+                return
+            if cmd == "ping":
+                reply = {"ok": True, "pid": os.getpid()}
+            elif cmd == "warm":
+                reply = self.warm()
+            elif cmd == "shutdown":
+                reply = {"ok": True}
+                self.shutdown()
+            else:
+                reply = {"ok": False, "error": f"unknown command {cmd!r}"}
+        except Exception as e:
+            print(f"Daemon request {cmd!r} failed: {e}")
+            reply = {"ok": False, "error": str(e)}
+        _send(conn, reply)
+        conn.close()
+
+    def open_window(self, msg, conn):
+        window = msg.get("window")
+        if not self.gui or window not in WINDOWS:
+            _send(conn, {"ok": False, "error": f"cannot open {window!r} here"})
+            conn.close()
+            return
+        import tkinter as tk
+        from app import AttendanceApp
+        from register_face import FaceRegisterApp
+
+        source = msg.get("source", "0")
+        top = tk.Toplevel(self.root)
+        try:
+            self.warm()
+            if window == "attendance":
+                AttendanceApp(top, source=source, matcher=self.matcher)
+            else:
+                FaceRegisterApp(top, source=source)
+            top.state("zoomed")
+        except Exception as e:
+            top.destroy()
+            _send(conn, {"ok": False, "error": str(e)})
+            conn.close()
+            return
+
+        def on_destroy(event):
+            if event.widget is top:
+                _send(conn, {"closed": True})
+                conn.close()
+        top.bind("<Destroy>", on_destroy, add="+")
+        _send(conn, {"ok": True})
+
+    def _poll(self):
+        while True:
+            try:
+                msg, conn = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            self.handle(msg, conn)
+        if self.running:
+            self.root.after(POLL_MS, self._poll)
+
+    def serve(self):
+        self._thread.start()
+        self.warm()
+        if self.gui:
+            import tkinter as tk
+            self.root = tk.Tk()
+            self.root.withdraw()
+            self.root.after(POLL_MS, self._poll)
+            self.root.mainloop()
+        else:
+            while self.running:
+                msg, conn = self.requests.get()
+                self.handle(msg, conn)
+
+    def shutdown(self):
+        self.running = False
+        self.listener.close()
+        if self.root is not None:
+            self.root.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm recognition daemon")
+    parser.add_argument("--no-gui", action="store_true",
+                        help="serve ping/warm only, without Tk")
+    parser.add_argument("--port", type=int, default=DAEMON_PORT)
+    args = parser.parse_args()
+
+    address = (DAEMON_ADDRESS[0], args.port)
+    try:
+        daemon = RecognitionDaemon(address, gui=not args.no_gui)
+    except OSError as e:
+        sys.exit(f"Cannot listen on {address[0]}:{address[1]} "
+                 f"(is a daemon already running?): {e}")
+    daemon.serve()
@@ -0,0 +1,154 @@
+import time
+from datetime import datetime
+
+import cv2
+import face_recognition
+
+from detectors import HogDetector
+from tracker import FaceTracker
+
+
+HOLD_SECONDS = 1.5
+
+
+class Recognizer:
+    """
+    Frame -> [(top, right, bottom, left, name)] in full-frame coordinates.
+    Detection runs on a copy downscaled by `scale`; names come from a
+    FaceMatcher ('Unknown' outside tolerance).
+
+    With `tracker=True` (or a FaceTracker) faces are followed between frames
+    and only new, stale or borderline tracks are encoded; a track's name is
+    the vote over its recent encodings. One tracker follows one camera.
+
+    `detector` is any detectors.py backend (HOG by default).
+
+    With an AdaptiveController the downscale, HOG upsampling and detection
+    stride follow the controller; frames it skips return the last faces.
+
+    set_matcher() swaps the gallery from any thread. A frame reads the
+    matcher once, so it is matched against either the old gallery or the
+    new one, never a mix.
+    """
+
+    def __init__(self, matcher, scale=0.25, tracker=None, controller=None,
+                 detector=None):
+        self.matcher = matcher
+        self.scale = scale
+        self.detector = detector or HogDetector()
+        if tracker is True:
+            tracker = FaceTracker(matcher.tolerance)
+        self.tracker = tracker
+        self.controller = controller
+        self.faces_seen = 0
+        self.faces_encoded = 0
+        self._last_faces = []
+        self._tracks_stale = False
+
+    def set_matcher(self, matcher):
+        """Use a new gallery from the next frame on"""
+        self.matcher = matcher
+        # votes cast against the old gallery are dropped on the next frame
+        self._tracks_stale = True
+
+    def _encode(self, matcher, rgb_small, face_locs):
+        self.faces_encoded += len(face_locs)
+        face_encs = face_recognition.face_encodings(rgb_small, face_locs)
+        return matcher.match(face_encs)
+
+    def __call__(self, frame):
+        controller = self.controller
+        if controller is None:
+            return self._recognize(frame, self.scale, None)
+        if not controller.should_detect():
+            return self._last_faces
+        start = time.perf_counter()
+        faces = self._recognize(frame, controller.scale, controller.upsample)
+        controller.record(time.perf_counter() - start)
+        return faces
+
+    def _recognize(self, frame, scale, upsample):
+        matcher = self.matcher
+        small_frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+        rgb_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+
+        face_locs = self.detector.detect(rgb_small, upsample)
+        self.faces_seen += len(face_locs)
+        up = 1.0 / scale
+        boxes = [(int(top*up), int(right*up), int(bottom*up), int(left*up))
+                 for top, right, bottom, left in face_locs]
+
+        if self.tracker is None:
+            names = (matcher.names_for(*self._encode(matcher, rgb_small, face_locs))
+                     if face_locs else [])
+        else:
+            if self._tracks_stale:
+                self._tracks_stale = False
+                self.tracker.reset()
+            # tracked in full-frame coordinates so a scale change keeps tracks
+            tracks = self.tracker.update(boxes)
+            due = [i for i, t in enumerate(tracks) if self.tracker.needs_encoding(t)]
+            if due:
+                best_idx, best_dist = self._encode(
+                    matcher, rgb_small, [face_locs[i] for i in due])
+                for i, name, dist in zip(
+                        due, matcher.names_for(best_idx, best_dist), best_dist):
+                    tracks[i].observe(name, float(dist))
+            names = [t.name for t in tracks]
+
+        self._last_faces = [box + (name,) for box, name in zip(boxes, names)]
+        return self._last_faces
+
+    def encode_ratio(self):
+        """Share of detected faces that needed a fresh encoding"""
+        return self.faces_encoded / self.faces_seen if self.faces_seen else 0.0
+
+
+class HoldStill:
+    """
+    The 'hold still' rule: a known face has to stay recognised for
+    `hold_seconds` before attendance is marked; an unknown face resets it.
+    """
+
+    def __init__(self, hold_seconds=HOLD_SECONDS):
+        self.hold_seconds = hold_seconds
+        self.pending_name = None
+        self.pending_start = None
+
+    def reset(self):
+        self.pending_name = None
+        self.pending_start = None
+
+    def update(self, faces, now=None):
+        """
+        Feed one frame's detections. Returns (state, name) where state is
+        'ready' (mark `name` now), 'pending', 'searching', or None when the
+        frame had no faces and the state is unchanged.
+        """
+        state, state_name = None, None
+        for *_, name in faces:
+            if name != "Unknown":
+                now = now or datetime.now()
+                if self.pending_name == name:
+                    elapsed = (now - self.pending_start).total_seconds()
+                    if elapsed >= self.hold_seconds:
+                        return "ready", name
+                else:
+                    self.pending_name = name
+                    self.pending_start = now
+                state, state_name = "pending", name
+            else:
+                self.reset()
+                state, state_name = "searching", None
+        return state, state_name
+
+
+def draw_faces(frame, faces):
+    """Draw boxes and names onto a BGR frame in place"""
+    for top, right, bottom, left, name in faces:
+        color = (74, 163, 22) if name != "Unknown" else (38, 38, 220)
+        cv2.rectangle(frame, (left, top),
+                      (right, bottom), color[::-1], 2)
+        cv2.putText(frame, name, (left, top-10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color[::-1], 2)
+    return frame
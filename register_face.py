@@ -1,16 +1,23 @@
 import os
 import cv2
-import pickle
-import re
+import argparse
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import ttk
 from PIL import Image, ImageTk, ImageOps
-import face_recognition
+
+from capture_quality import AUTO_CAPTURE_COUNT, AutoCapture
+from capture_writer import DEFAULT_JPEG_QUALITY, IMAGE_FORMATS, CaptureWriter
+from dataset_index import DatasetIndex
+from encoder import update_encodings
+from sources import open_source
+from user_names import sanitize_name
 
 
 DATASET_DIR = os.path.join("dataset", "faces")
 ENCODINGS_PATH = os.path.join("encodings", "face_encodings.pkl")
+BURST_COUNT = 10
+BURST_INTERVAL_MS = 200
 
 
 COLORS = {
@@ -29,14 +36,28 @@ COLORS = {
 
 
 class FaceRegisterApp:
-    def __init__(self, root):
+    def __init__(self, root, full_rebuild=False, source="0", image_format="jpg",
+                 jpeg_quality=DEFAULT_JPEG_QUALITY, burst_count=BURST_COUNT,
+                 burst_interval_ms=BURST_INTERVAL_MS, auto_count=AUTO_CAPTURE_COUNT):
         self.root = root
+        self.full_rebuild = full_rebuild
+        self.source = source
+        self.burst_count = burst_count
+        self.burst_interval_ms = burst_interval_ms
+        self.auto_count = auto_count
+        self.auto = None
+        self._auto_pending = []
+        self._auto_save_after_id = None
+        os.makedirs(DATASET_DIR, exist_ok=True)
+        # every saved capture goes straight into the dataset index
+        self.index = DatasetIndex(DATASET_DIR)
+        self.writer = CaptureWriter(image_format, jpeg_quality,
+                                    on_written=self.index.add_image)
         self.root.title("Smart Attendance - Face Registration")
         self.root.geometry("1000x650")
         self.root.minsize(950, 620)
         self.root.configure(bg=COLORS["app_bg"])
 
-        os.makedirs(DATASET_DIR, exist_ok=True)
         os.makedirs(os.path.dirname(ENCODINGS_PATH), exist_ok=True)
 
         self._setup_styles()
@@ -45,9 +66,13 @@ class FaceRegisterApp:
         #  Internal state
         self.cap = None
         self.current_frame = None
+        self.frame_seq = 0
         self.captured_count = 0
         self.user_folder = None
         self._video_after_id = None
+        self._burst_after_id = None
+        self._burst_left = 0
+        self._burst_seq = None
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.set_status("Idle", kind="info")
@@ -208,6 +233,13 @@ class FaceRegisterApp:
         ttk.Button(btns, text="Capture", style="Ghost.TButton",
                    command=self.capture_frame).grid(row=0, column=1, sticky="ew", padx=(6, 0), pady=6)
 
+        ttk.Button(btns, text=f"Burst ({self.burst_count} shots)", style="Ghost.TButton",
+                   command=self.burst_capture).grid(row=1, column=0, sticky="ew", padx=(0, 6), pady=(0, 6))
+
+        self.btn_auto = ttk.Button(btns, text="Auto Capture", style="Ghost.TButton",
+                                   command=self.toggle_auto_capture)
+        self.btn_auto.grid(row=1, column=1, sticky="ew", padx=(6, 0), pady=(0, 6))
+
         ttk.Button(controls_card, text="Finish & Save", style="Success.TButton",
                    command=self.finish_and_save).grid(row=3, column=0, sticky="ew", padx=14, pady=(0, 12))
 
@@ -246,10 +278,7 @@ class FaceRegisterApp:
         self.root.update_idletasks()
 
     def sanitize_name(self, name: str) -> str:
-        name = name.strip()
-        name = re.sub(r"\s+", "_", name)
-        name = re.sub(r"[^a-zA-Z0-9_\-\.]", "", name)
-        return name
+        return sanitize_name(name)
 
     def start_camera(self):
         raw_name = self.name_var.get().strip()
@@ -269,11 +298,13 @@ class FaceRegisterApp:
         self.user_folder = os.path.join(DATASET_DIR, name)
         os.makedirs(self.user_folder, exist_ok=True)
 
+        self.cancel_burst()
+        self.stop_auto_capture(save=False)
         if self.cap is not None:
             self.cap.release()
             self.cap = None
 
-        self.cap = cv2.VideoCapture(0)
+        self.cap = open_source(self.source)
         if not self.cap.isOpened():
             messagebox.showerror("Error", "Could not open camera.")
             self.set_status("Could not open camera.", kind="err")
@@ -295,6 +326,11 @@ class FaceRegisterApp:
             return
 
         self.current_frame = frame
+        self.frame_seq += 1
+        if self.auto is not None:
+            self.auto.offer(frame)
+            if self.frame_seq % 10 == 0:
+                self.update_auto_status()
 
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         img = Image.fromarray(frame_rgb)
@@ -315,13 +351,125 @@ class FaceRegisterApp:
             self.set_status("Start the camera first.", kind="warn")
             return
 
-        filename = os.path.join(
-            self.user_folder, f"img_{self.captured_count}.jpg")
-        cv2.imwrite(filename, self.current_frame)
+        if self.writer.submit(self.current_frame, self.user_folder) is None:
+            self.set_status("Still saving earlier shots, try again.", kind="warn")
+            return
+        self.captured_count += 1
+        self.show_capture_status()
+
+    def show_capture_status(self):
+        pending = self.writer.pending()
+        text = f"Captured {self.captured_count} image(s)."
+        if pending:
+            text += f" ({pending} saving)"
+        if self._burst_left:
+            text += f" Burst: {self._burst_left} left."
+        self.set_status(text, kind="ok")
+
+    def burst_capture(self):
+        """Take `burst_count` shots `burst_interval_ms` apart, each from a new frame"""
+        if self.cap is None or self.current_frame is None:
+            messagebox.showwarning("No camera", "Start the camera first.")
+            self.set_status("Start the camera first.", kind="warn")
+            return
+        self.cancel_burst()
+        self._burst_left = self.burst_count
+        self._burst_seq = None
+        self._burst_step()
+
+    def _burst_step(self):
+        self._burst_after_id = None
+        if self.cap is None or self._burst_left <= 0:
+            self._burst_left = 0
+            return
+        if self.frame_seq == self._burst_seq:
+            # no new preview frame yet
+            self._burst_after_id = self.root.after(10, self._burst_step)
+            return
+        if self.writer.submit(self.current_frame, self.user_folder) is None:
+            # disk is behind: hold the burst until the writer catches up
+            self.set_status("Waiting for disk...", kind="warn")
+            self._burst_after_id = self.root.after(50, self._burst_step)
+            return
+        self._burst_seq = self.frame_seq
+        self._burst_left -= 1
         self.captured_count += 1
-        self.set_status(f"Captured {self.captured_count} image(s).", kind="ok")
+        self.show_capture_status()
+        if self._burst_left:
+            self._burst_after_id = self.root.after(
+                self.burst_interval_ms, self._burst_step)
+
+    def toggle_auto_capture(self):
+        if self.auto is not None:
+            self.stop_auto_capture(save=True)
+            return
+        if self.cap is None or self.current_frame is None:
+            messagebox.showwarning("No camera", "Start the camera first.")
+            self.set_status("Start the camera first.", kind="warn")
+            return
+        self.auto = AutoCapture(self.auto_count)
+        self.auto.start()
+        self.btn_auto.configure(text="Stop Auto Capture")
+        self.set_status(
+            "Auto capture: look at the camera and turn your head slowly.", kind="info")
+
+    def update_auto_status(self):
+        auto = self.auto
+        if auto.finished:
+            self.stop_auto_capture(save=True)
+            return
+        poses = ", ".join(f"{n} {p}" for p, n in auto.poses().items() if n)
+        rejected = max(auto.rejected.items(), key=lambda kv: kv[1], default=None)
+        text = f"Auto capture: {auto.count()}/{auto.target} selected"
+        if poses:
+            text += f" ({poses})"
+        if rejected:
+            text += f"; mostly rejected as {rejected[0]}"
+        self.set_status(text, kind="info")
+
+    def stop_auto_capture(self, save=True):
+        """Stop scoring and queue the selected frames for writing"""
+        auto, self.auto = self.auto, None
+        if auto is None:
+            return
+        auto.stop()
+        self.btn_auto.configure(text="Auto Capture")
+        if save:
+            self._auto_pending = auto.selected()
+            self._save_auto_selection()
+
+    def _save_auto_selection(self):
+        self._cancel_auto_save()
+        while self._auto_pending:
+            if self.writer.submit(self._auto_pending[0], self.user_folder) is None:
+                # writer backed up; try again shortly
+                self._auto_save_after_id = self.root.after(
+                    50, self._save_auto_selection)
+                return
+            self._auto_pending.pop(0)
+            self.captured_count += 1
+        self.show_capture_status()
+
+    def _cancel_auto_save(self):
+        if self._auto_save_after_id is not None:
+            self.root.after_cancel(self._auto_save_after_id)
+            self._auto_save_after_id = None
+
+    def cancel_burst(self):
+        self._burst_left = 0
+        if self._burst_after_id is not None:
+            self.root.after_cancel(self._burst_after_id)
+            self._burst_after_id = None
 
     def finish_and_save(self):
+        self.cancel_burst()
+        self.stop_auto_capture(save=True)
+        while self._auto_pending:
+            self.writer.flush()
+            self._save_auto_selection()
+        # the last pass may have left a retry scheduled
+        self._cancel_auto_save()
+
         # Stop camera
         if self.cap is not None:
             self.cap.release()
@@ -343,44 +491,33 @@ class FaceRegisterApp:
                 "No images captured. Nothing to save.", kind="warn")
             return
 
+        self.set_status("Saving images...", kind="info")
+        self.writer.flush()
+        if self.writer.failed:
+            messagebox.showwarning(
+                "Save errors",
+                f"{self.writer.failed} image(s) could not be saved: {self.writer.last_error}")
+
         self.set_status("Generating encodings... Please wait.", kind="info")
-        self.generate_encodings()
+        stats = self.generate_encodings()
 
         self.set_status(
-            f"Done. Saved {self.captured_count} images. Encodings updated.", kind="ok")
+            f"Done. Saved {self.captured_count} images. Encodings updated: "
+            f"{stats['encoded']} new, {stats['faces']} in gallery.", kind="ok")
         messagebox.showinfo(
             "Success", "User registered and encodings updated.")
 
     def generate_encodings(self):
-        known_encodings = []
-        known_names = []
-
-        for user in os.listdir(DATASET_DIR):
-            user_dir = os.path.join(DATASET_DIR, user)
-            if not os.path.isdir(user_dir):
-                continue
-
-            for img_name in os.listdir(user_dir):
-                img_path = os.path.join(user_dir, img_name)
-                try:
-                    image = face_recognition.load_image_file(img_path)
-                    face_locations = face_recognition.face_locations(image)
-
-                    if len(face_locations) != 1:
-                        continue
-
-                    encoding = face_recognition.face_encodings(
-                        image, face_locations)[0]
-                    known_encodings.append(encoding)
-                    known_names.append(user)
-                except Exception as e:
-                    print(f"Error processing {img_path}: {e}")
-
-        data = {"encodings": known_encodings, "names": known_names}
-        with open(ENCODINGS_PATH, "wb") as f:
-            pickle.dump(data, f)
+        """Encode new/changed images only (or everything with --full-rebuild)"""
+        return update_encodings(
+            DATASET_DIR, ENCODINGS_PATH, full_rebuild=self.full_rebuild)
 
     def on_close(self):
+        self.cancel_burst()
+        self.stop_auto_capture(save=False)
+        self._cancel_auto_save()
+        self.writer.close()
+        self.index.close()
         if self.cap is not None:
             self.cap.release()
             self.cap = None
@@ -388,7 +525,26 @@ class FaceRegisterApp:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Face registration")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="re-encode every image instead of only new ones")
+    parser.add_argument("--source", default="0",
+                        help="camera index, video file, stream URL or 'synthetic'")
+    parser.add_argument("--format", default="jpg", choices=IMAGE_FORMATS,
+                        help="capture format (png is lossless)")
+    parser.add_argument("--jpeg-quality", type=int, default=DEFAULT_JPEG_QUALITY)
+    parser.add_argument("--burst-count", type=int, default=BURST_COUNT)
+    parser.add_argument("--burst-interval", type=int, default=BURST_INTERVAL_MS,
+                        help="milliseconds between burst shots")
+    parser.add_argument("--auto-count", type=int, default=AUTO_CAPTURE_COUNT,
+                        help="images kept by auto capture")
+    args = parser.parse_args()
+
     root = tk.Tk()
     root.state("zoomed")
-    app = FaceRegisterApp(root)
+    app = FaceRegisterApp(
+        root, full_rebuild=args.full_rebuild, source=args.source,
+        image_format=args.format, jpeg_quality=args.jpeg_quality,
+        burst_count=args.burst_count, burst_interval_ms=args.burst_interval,
+        auto_count=args.auto_count)
     root.mainloop()
@@ -0,0 +1,129 @@
+import threading
+from datetime import datetime
+
+from fpdf import FPDF
+
+from attendance_store import AttendanceStore
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def write_attendance_pdf(path, chunks, total, subtitle="", progress=None, cancel=None):
+    """
+    Write the attendance report to `path` from an iterable of row chunks.
+
+    Rows are consumed chunk by chunk, so the full log is never held as a
+    Python list. `progress(done, total)` is called after every chunk and a
+    set `cancel` event aborts with ExportCancelled before the file is
+    written. Returns the number of rows written.
+    """
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+
+    # Title
+    pdf.set_font("Helvetica", "B", 16)
+    pdf.cell(0, 10, "Attendance Report", ln=True, align="C")
+    pdf.ln(8)
+
+    pdf.set_font("Helvetica", "", 10)
+    pdf.cell(
+        0,
+        8,
+        f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        ln=True,
+        align="R"
+    )
+    if subtitle:
+        pdf.cell(0, 8, subtitle, ln=True, align="R")
+    pdf.ln(4)
+
+    # Table header
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(80, 10, "Name", 1)
+    pdf.cell(50, 10, "Date", 1)
+    pdf.cell(50, 10, "Time", 1)
+    pdf.ln()
+
+    # Table rows
+    pdf.set_font("Helvetica", "", 12)
+    done = 0
+    for chunk in chunks:
+        if cancel is not None and cancel.is_set():
+            raise ExportCancelled()
+        for name, date_str, time_str in chunk:
+            pdf.cell(80, 10, str(name), 1)
+            pdf.cell(50, 10, str(date_str), 1)
+            pdf.cell(50, 10, str(time_str), 1)
+            pdf.ln()
+        done += len(chunk)
+        if progress is not None:
+            progress(done, total)
+
+    if cancel is not None and cancel.is_set():
+        raise ExportCancelled()
+    pdf.output(path)
+    return done
+
+
+class PdfExportJob(threading.Thread):
+    """
+    Runs write_attendance_pdf on a background thread, streaming rows from
+    its own connection to the store's database (so the GUI's connection
+    stays free and may close). The GUI polls `done`, `total`, `finished`
+    and `error` and calls cancel() to stop it.
+    """
+
+    def __init__(self, store, path, date_from=None, date_to=None, name=None,
+                 chunk_size=5000):
+        super().__init__(name="pdf-export", daemon=True)
+        self.db_path = store.db_path
+        self.csv_path = store.csv_path
+        self.path = path
+        self.filters = {"date_from": date_from, "date_to": date_to, "name": name}
+        self.chunk_size = chunk_size
+
+        self.total = store.count_rows(**self.filters)
+        self.done = 0
+        self.finished = False
+        self.cancelled = False
+        self.error = None
+        self._cancel = threading.Event()
+
+    def subtitle(self):
+        parts = []
+        date_from, date_to = self.filters["date_from"], self.filters["date_to"]
+        if date_from or date_to:
+            parts.append(f"Dates: {date_from or '...'} to {date_to or '...'}")
+        if self.filters["name"]:
+            parts.append(f"Person: {self.filters['name']}")
+        return "  |  ".join(parts)
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _progress(self, done, total):
+        self.done = done
+
+    def run(self):
+        store = None
+        try:
+            store = AttendanceStore(self.db_path, self.csv_path)
+            write_attendance_pdf(
+                self.path,
+                store.iter_chunks(self.chunk_size, **self.filters),
+                self.total,
+                subtitle=self.subtitle(),
+                progress=self._progress,
+                cancel=self._cancel,
+            )
+        except ExportCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+        finally:
+            if store is not None:
+                store.close()
+            self.finished = True
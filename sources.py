@@ -0,0 +1,87 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class SyntheticSource:
+    """
+    Camera stand-in that renders numbered test frames at a fixed rate.
+    Same read()/release()/isOpened() surface as cv2.VideoCapture, so the
+    pipelines and the web server can run without hardware.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_index = 0
+        self._next_at = time.perf_counter()
+        self._opened = True
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        delay = self._next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_at = max(self._next_at, time.perf_counter()) + 1.0 / self.fps
+
+        frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        frame[:, :, 0] = np.linspace(40, 120, self.width, dtype=np.uint8)[None, :]
+        x = (self.frame_index * 8) % self.width
+        frame[:, x:x + 20, 1] = 200
+        cv2.putText(frame, f"frame {self.frame_index}", (20, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+        self.frame_index += 1
+        return True, frame
+
+    def release(self):
+        self._opened = False
+
+
+class LoopingFileSource:
+    """Plays a video file at its own frame rate, rewinding at the end"""
+
+    def __init__(self, path, fps=None):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self._next_at = time.perf_counter()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        delay = self._next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_at = max(self._next_at, time.perf_counter()) + 1.0 / self.fps
+
+        ret, frame = self.cap.read()
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+def open_source(spec):
+    """
+    Open a frame source from a config string:
+    'synthetic', a device index ('0'), a video file path (looped) or an
+    RTSP/HTTP URL.
+    """
+    spec = str(spec).strip()
+    if spec == "synthetic":
+        return SyntheticSource()
+    if spec.isdigit():
+        return cv2.VideoCapture(int(spec))
+    if "://" in spec:
+        return cv2.VideoCapture(spec)
+    return LoopingFileSource(spec)
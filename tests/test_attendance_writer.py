@@ -0,0 +1,26 @@
+"""
+AttendanceWriter under concurrent processes (a small run of
+benchmarks/stress_attendance_writer.py) and its atomic clear().
+"""
+import os
+
+from attendance_store import CSV_HEADER, AttendanceWriter, format_rows
+from benchmarks.stress_attendance_writer import run
+
+
+def test_concurrent_writers_lose_and_duplicate_nothing():
+    errors, total, _ = run(procs=4, rows=100, shared=10, window=0.05)
+    assert errors == []
+    assert total == 4 * 100 + 10
+
+
+def test_clear_leaves_a_header_only_log(tmp_path):
+    csv_path = str(tmp_path / "attendance.csv")
+    writer = AttendanceWriter(csv_path)
+    writer.append([["alice", "2026-01-01", "09:00:00"]])
+    writer.clear()
+    writer.close()
+
+    with open(csv_path, "rb") as f:
+        assert f.read() == format_rows([CSV_HEADER])
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
@@ -0,0 +1,85 @@
+"""
+AttendanceService / Flask routes driven by a fake camera and recognizer,
+so no hardware or face models are needed (cv2 and flask still are).
+"""
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("flask")
+
+from dataset_index import DatasetIndex  # noqa: E402
+from recognizer import HoldStill  # noqa: E402
+from web import AttendanceService, create_app  # noqa: E402
+
+
+class FakeSource:
+    def __init__(self):
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        time.sleep(0.005)
+        return self.opened, np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def release(self):
+        self.opened = False
+
+
+class FakeStore:
+    def __init__(self):
+        self.marked = []
+
+    def mark(self, name):
+        first = name not in self.marked
+        self.marked.append(name)
+        return first, "09:00:00"
+
+
+def alice_recognizer():
+    return lambda frame: [(10, 60, 60, 10, "alice")]
+
+
+@pytest.fixture
+def service():
+    service = AttendanceService(FakeSource, FakeStore(),
+                                recognizer_factory=alice_recognizer,
+                                idle_timeout=0.05)
+    service.hold = HoldStill(hold_seconds=0.0)
+    return service
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_grab_frames_does_not_mark_attendance(service):
+    frames = service.grab_frames(3, 0.02)
+    assert len(frames) == 3
+    assert service.store.marked == []
+    assert service.last_event is None
+
+
+def test_check_status_reports_success_then_already_marked(service, tmp_path):
+    app = create_app(store=service.store, service=service,
+                     index=DatasetIndex(str(tmp_path / "faces")))
+    client = app.test_client()
+    assert client.get("/check_status").get_json()["status"] == "waiting"
+
+    for expected in ("success", "already_marked"):
+        service.begin_session()
+        service.attach()
+        try:
+            wait_for(lambda: service.last_event is not None)
+        finally:
+            service.detach()
+        body = client.get("/check_status").get_json()
+        assert body["status"] == expected
+        assert body["name"] == "alice"
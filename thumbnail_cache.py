@@ -0,0 +1,162 @@
+"""
+Thumbnail cache for browsing dataset/faces.
+
+ThumbnailCache keeps reduced copies of photos in memory (LRU) and on disk
+(THUMB_DIR). A disk thumbnail carries its source's mtime as its own, so a
+retaken photo is noticed without a separate index, and the file is
+simply overwritten; prune() drops the thumbnails of photos that are gone.
+prefetch() fills the cache from a small thread pool, so Previous/Next
+usually finds the image already decoded.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+
+THUMB_DIR = os.path.join("cache", "thumbnails")
+THUMB_SIZE = (800, 600)
+MEMORY_ITEMS = 64
+
+# cache directories already pruned by this process
+_pruned_dirs = set()
+_pruned_lock = threading.Lock()
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir=THUMB_DIR, size=THUMB_SIZE,
+                 memory_items=MEMORY_ITEMS, workers=2):
+        self.cache_dir = cache_dir
+        self.size = tuple(size)
+        self.memory_items = memory_items
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()   # (path, mtime_ns) -> PIL image
+        self._lock = threading.Lock()
+        self._inflight = set()
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="thumbs")
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, path):
+        key = f"{os.path.abspath(path)}|{self.size[0]}x{self.size[1]}"
+        return os.path.join(
+            self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".jpg")
+
+    def _remember(self, key, img):
+        with self._lock:
+            self._memory[key] = img
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def peek(self, path):
+        """The cached thumbnail if it is in memory and current, else None"""
+        try:
+            key = (path, os.stat(path).st_mtime_ns)
+        except OSError:
+            return None
+        with self._lock:
+            img = self._memory.get(key)
+            if img is not None:
+                self._memory.move_to_end(key)
+            return img
+
+    def get(self, path):
+        """Thumbnail of `path` (a PIL image no larger than `size`)"""
+        mtime = os.stat(path).st_mtime_ns
+        key = (path, mtime)
+        with self._lock:
+            img = self._memory.get(key)
+            if img is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return img
+
+        thumb_path = self._disk_path(path)
+        img = None
+        try:
+            if os.stat(thumb_path).st_mtime_ns == mtime:
+                with Image.open(thumb_path) as f:
+                    img = f.convert("RGB")
+                self.disk_hits += 1
+        except OSError:
+            pass
+
+        if img is None:
+            self.misses += 1
+            with Image.open(path) as f:
+                # let the JPEG decoder skip detail we would throw away
+                f.draft("RGB", self.size)
+                img = ImageOps.exif_transpose(f).convert("RGB")
+            img.thumbnail(self.size)
+            tmp_path = thumb_path + ".tmp"
+            try:
+                img.save(tmp_path, "JPEG", quality=90)
+                os.utime(tmp_path, ns=(mtime, mtime))
+                os.replace(tmp_path, thumb_path)
+            except OSError as e:
+                print(f"Thumbnail cache write failed for {path}: {e}")
+
+        self._remember(key, img)
+        return img
+
+    def _prefetch_one(self, path):
+        try:
+            self.get(path)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._inflight.discard(path)
+
+    def prefetch(self, paths):
+        """Warm the cache for `paths` in the background"""
+        for path in paths:
+            if self.peek(path) is not None:
+                continue
+            with self._lock:
+                if path in self._inflight:
+                    continue
+                self._inflight.add(path)
+            self._pool.submit(self._prefetch_one, path)
+
+    def prune(self, paths):
+        """
+        Delete disk thumbnails that belong to none of `paths` (deleted or
+        renamed photos, or another thumbnail size); returns how many.
+        """
+        paths = set(paths)
+        keep = {os.path.basename(self._disk_path(path)) for path in paths}
+        removed = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name in keep or not entry.is_file():
+                continue
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+        with self._lock:
+            for key in [key for key in self._memory if key[0] not in paths]:
+                del self._memory[key]
+        return removed
+
+    def prune_in_background(self, list_paths):
+        """
+        prune(list_paths()) on the thread pool, once per cache directory per
+        process, so opening the window again costs nothing.
+        """
+        with _pruned_lock:
+            if self.cache_dir in _pruned_dirs:
+                return None
+            _pruned_dirs.add(self.cache_dir)
+        return self._pool.submit(lambda: self.prune(list_paths()))
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
@@ -0,0 +1,132 @@
+from collections import Counter, deque
+from itertools import count
+
+
+TRACK_IOU = 0.3           # min overlap to continue a track
+MAX_MISSES = 5            # frames a track survives without a detection
+REENCODE_EVERY = 15       # frames between refresh encodings of a stable track
+LOW_CONFIDENCE = 0.06     # re-encode every frame while |dist - tolerance| < this
+VOTE_WINDOW = 7           # encodings kept for the identity vote
+
+
+def iou(a, b):
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    inter = max(0, bottom - top) * max(0, right - left)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / float(area_a + area_b - inter)
+
+
+def _centroid_close(a, b):
+    """Fallback for fast movers: centres within half a face width"""
+    ay, ax = (a[0] + a[2]) / 2, (a[1] + a[3]) / 2
+    by, bx = (b[0] + b[2]) / 2, (b[1] + b[3]) / 2
+    size = max(a[1] - a[3], b[1] - b[3], 1)
+    return (ay - by) ** 2 + (ax - bx) ** 2 <= (size / 2) ** 2
+
+
+class Track:
+    """One face followed across frames, with its recent identity votes"""
+
+    def __init__(self, track_id, box, vote_window=VOTE_WINDOW):
+        self.track_id = track_id
+        self.box = box
+        self.misses = 0
+        self.since_encode = None     # None until the first encoding
+        self.last_dist = None
+        self.votes = deque(maxlen=vote_window)
+
+    def observe(self, name, dist):
+        self.votes.append(name)
+        self.last_dist = dist
+        self.since_encode = 0
+
+    @property
+    def name(self):
+        """Majority of the recent votes; ties go to the most recent name"""
+        if not self.votes:
+            return "Unknown"
+        counts = Counter(self.votes)
+        best = max(counts.values())
+        for name in reversed(self.votes):
+            if counts[name] == best:
+                return name
+
+
+class FaceTracker:
+    """
+    Greedy IoU (then centroid) association of detections to tracks.
+
+    update() is called with every frame's face boxes and returns the track
+    for each box. needs_encoding() says which of them are worth a 128-d
+    encoding this frame: new tracks, tracks due a periodic refresh, and
+    tracks whose last distance sat close to the match tolerance.
+    """
+
+    def __init__(self, tolerance, iou_threshold=TRACK_IOU, max_misses=MAX_MISSES,
+                 reencode_every=REENCODE_EVERY, low_confidence=LOW_CONFIDENCE,
+                 vote_window=VOTE_WINDOW):
+        self.tolerance = tolerance
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.reencode_every = reencode_every
+        self.low_confidence = low_confidence
+        self.vote_window = vote_window
+        self.tracks = []
+        self._ids = count(1)
+
+    def reset(self):
+        self.tracks = []
+
+    def update(self, boxes):
+        pairs = sorted(
+            ((iou(t.box, b), ti, bi)
+             for ti, t in enumerate(self.tracks) for bi, b in enumerate(boxes)),
+            reverse=True)
+        assigned = [None] * len(boxes)
+        used = set()
+        for overlap, ti, bi in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if ti not in used and assigned[bi] is None:
+                assigned[bi] = self.tracks[ti]
+                used.add(ti)
+        for bi, box in enumerate(boxes):
+            if assigned[bi] is not None:
+                continue
+            for ti, track in enumerate(self.tracks):
+                if ti not in used and _centroid_close(track.box, box):
+                    assigned[bi] = track
+                    used.add(ti)
+                    break
+
+        survivors = []
+        for ti, track in enumerate(self.tracks):
+            if ti in used:
+                track.misses = 0
+                survivors.append(track)
+            else:
+                track.misses += 1
+                if track.misses <= self.max_misses:
+                    survivors.append(track)
+        for bi, box in enumerate(boxes):
+            if assigned[bi] is None:
+                assigned[bi] = Track(next(self._ids), box, self.vote_window)
+                survivors.append(assigned[bi])
+            else:
+                assigned[bi].box = box
+                if assigned[bi].since_encode is not None:
+                    assigned[bi].since_encode += 1
+        self.tracks = survivors
+        return assigned
+
+    def needs_encoding(self, track):
+        if track.since_encode is None:
+            return True
+        if track.since_encode >= self.reencode_every:
+            return True
+        return abs(track.last_dist - self.tolerance) < self.low_confidence
@@ -0,0 +1,13 @@
+"""
+User name/ID handling shared by the registration GUI and the web service.
+"""
+import re
+
+
+def sanitize_name(name):
+    """Turn a user name/ID into a safe dataset folder name"""
+    name = name.strip()
+    name = re.sub(r"\s+", "_", name)
+    name = re.sub(r"[^a-zA-Z0-9_\-\.]", "", name)
+    # no '.', '..' or hidden folders
+    return name.lstrip(".")
@@ -0,0 +1,125 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTable(tk.Frame):
+    """
+    Treeview that only materializes the rows on screen.
+
+    `source` provides count() and fetch(offset, limit) (and set_sort(column)
+    for clickable headings). The table keeps a small cache of the visible
+    window plus `margin` rows either side, so scrolling a few rows does not
+    hit the source; the Treeview itself only ever holds one screenful of
+    items, which are updated in place as the window moves.
+    """
+
+    def __init__(self, parent, source, columns, headings, margin=100, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.source = source
+        self.columns = columns
+        self.headings = headings
+        self.margin = margin
+
+        self.total = 0
+        self.offset = 0
+        self._cache_start = 0
+        self._cache = []
+        self._items = []
+
+        self.tree = ttk.Treeview(
+            self, columns=columns, show="headings", selectmode="browse")
+        for col in columns:
+            self.tree.heading(col, text=headings[col],
+                              command=lambda c=col: self.sort_by(c))
+        self.scroll = ttk.Scrollbar(
+            self, orient="vertical", command=self._on_scrollbar)
+
+        self.scroll.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.tree.bind("<Configure>", lambda e: self.render())
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_by(3))
+        for key, step in (("<Up>", -1), ("<Down>", 1)):
+            self.tree.bind(key, lambda e, s=step: self.scroll_by(s) or "break")
+        self.tree.bind("<Prior>", lambda e: self.scroll_by(-self.page_size()) or "break")
+        self.tree.bind("<Next>", lambda e: self.scroll_by(self.page_size()) or "break")
+
+    # Geometry
+
+    def page_size(self):
+        """Rows that fit in the tree below the heading"""
+        style = ttk.Style()
+        row_height = int(style.lookup("Treeview", "rowheight") or 20)
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return 20
+        return max(1, height // row_height - 1)
+
+    # Data
+
+    def refresh(self, keep_position=True):
+        """Re-count and re-fetch the visible window (after data/filter changes)"""
+        self.total = self.source.count()
+        if not keep_position:
+            self.offset = 0
+        self._cache = []
+        self.render()
+
+    def sort_by(self, column):
+        self.source.set_sort(column)
+        for col in self.columns:
+            arrow = ""
+            if col == self.source.sort_by:
+                arrow = " ▼" if self.source.descending else " ▲"
+            self.tree.heading(col, text=self.headings[col] + arrow)
+        self.refresh(keep_position=False)
+
+    def _rows(self, start, count):
+        end = start + count
+        cache_end = self._cache_start + len(self._cache)
+        cache_complete = cache_end >= min(end, self.total)
+        if not (self._cache_start <= start and cache_complete):
+            self._cache_start = max(0, start - self.margin)
+            self._cache = self.source.fetch(
+                self._cache_start, count + 2 * self.margin)
+        lo = start - self._cache_start
+        return self._cache[lo:lo + count]
+
+    # Rendering
+
+    def render(self):
+        size = self.page_size()
+        self.offset = max(0, min(self.offset, self.total - size))
+        rows = self._rows(self.offset, size) if self.total else []
+
+        # grow/shrink the pool of Treeview items, then update them in place
+        while len(self._items) < len(rows):
+            self._items.append(self.tree.insert("", "end", values=()))
+        while len(self._items) > len(rows):
+            self.tree.delete(self._items.pop())
+        for iid, row in zip(self._items, rows):
+            self.tree.item(iid, values=row)
+
+        if self.total:
+            first = self.offset / self.total
+            last = min(1.0, (self.offset + size) / self.total)
+            self.scroll.set(first, last)
+        else:
+            self.scroll.set(0.0, 1.0)
+
+    def scroll_by(self, rows):
+        self.offset += rows
+        self.render()
+
+    def _on_wheel(self, event):
+        self.scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.offset = int(float(value) * self.total)
+            self.render()
+        elif action == "scroll":
+            step = self.page_size() if unit == "pages" else 1
+            self.scroll_by(int(value) * step)
@@ -0,0 +1,301 @@
+import os
+import time
+import shutil
+import argparse
+import threading
+
+import cv2
+from flask import Flask, Response, abort, jsonify, redirect, render_template, request, url_for
+
+from adaptive import AdaptiveController
+from attendance_store import ATTENDANCE_DB, ATTENDANCE_PATH, CSV_HEADER, AttendanceStore
+from capture_writer import next_free_index
+from dataset_index import DATASET_DIR, DatasetIndex
+from detectors import build_detector
+from gallery_store import GALLERY_DIR, ENCODINGS_PATH, load_gallery
+from matcher import FaceMatcher
+from pipeline import RecognitionPipeline
+from recognizer import HoldStill, Recognizer, draw_faces
+from sources import open_source
+from user_names import sanitize_name
+
+
+GALLERY_INDEX = "brute"
+DETECTOR = "hog"
+ADD_USER_SHOTS = 10
+ADD_USER_INTERVAL = 0.3
+VIEW_ATTENDANCE_LIMIT = 500
+
+# update_encodings() writes the manifest, pickle and gallery through fixed
+# .tmp paths, so two runs must never overlap
+_encodings_lock = threading.Lock()
+
+
+def load_recognizer():
+    """Recognizer over the current gallery, or None if nobody is registered"""
+    data = load_gallery(GALLERY_DIR, ENCODINGS_PATH)
+    if data is None or len(data["names"]) == 0:
+        return None
+    return Recognizer(FaceMatcher.from_known_data(data, index=GALLERY_INDEX),
+                      tracker=True, controller=AdaptiveController(),
+                      detector=build_detector(DETECTOR))
+
+
+class AttendanceService:
+    """
+    One capture + recognition pipeline shared by every web viewer.
+
+    The pipeline starts with the first attached viewer and stops
+    `idle_timeout` seconds after the last one leaves. Recognition, the
+    hold-still rule and attendance marking all run on the pipeline's worker
+    thread; viewers only read the newest frame, and each frame is JPEG
+    encoded once no matter how many streams are open. While grab_frames()
+    collects registration photos nobody is marked present.
+    """
+
+    def __init__(self, source_factory, store, recognizer_factory=load_recognizer,
+                 idle_timeout=5.0, jpeg_quality=80):
+        self.source_factory = source_factory
+        self.store = store
+        self.recognizer_factory = recognizer_factory
+        self.idle_timeout = idle_timeout
+        self.jpeg_quality = jpeg_quality
+
+        self.recognizer = recognizer_factory()
+        self.hold = HoldStill()
+        self.faces = []
+        self.last_event = None
+
+        self.pipeline = None
+        self.viewers = 0
+        self._enrolling = 0
+        self._lock = threading.Lock()
+        self._idle_timer = None
+        self._jpeg_id = None
+        self._jpeg = None
+
+    # Lifecycle
+
+    def attach(self):
+        with self._lock:
+            self.viewers += 1
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            if self.pipeline is None:
+                self.pipeline = RecognitionPipeline(
+                    self.source_factory(), self.process_frame)
+                self.pipeline.start()
+            return self.pipeline
+
+    def detach(self):
+        with self._lock:
+            self.viewers -= 1
+            if self.viewers == 0 and self._idle_timer is None:
+                self._idle_timer = threading.Timer(
+                    self.idle_timeout, self._stop_if_idle)
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+
+    def _stop_if_idle(self):
+        with self._lock:
+            self._idle_timer = None
+            if self.viewers > 0 or self.pipeline is None:
+                return
+            pipeline, self.pipeline = self.pipeline, None
+        pipeline.stop()
+
+    def reload_gallery(self):
+        self.recognizer = self.recognizer_factory()
+
+    # Recognition (worker thread)
+
+    def process_frame(self, frame):
+        recognizer = self.recognizer
+        faces = recognizer(frame) if recognizer is not None else []
+        self.faces = faces
+        if self._enrolling:
+            # the person in front of the camera is being photographed
+            self.hold.reset()
+            return faces
+        state, name = self.hold.update(faces)
+        if state == "ready":
+            marked, time_str = self.store.mark(name)
+            self.last_event = {
+                "name": name, "time": time_str, "already_marked": not marked}
+            self.hold.reset()
+        return faces
+
+    def begin_session(self):
+        """Forget the previous mark so /check_status waits for a new one"""
+        self.last_event = None
+        self.hold.reset()
+
+    # Streaming
+
+    def jpeg(self, packet):
+        frame_id, _, frame = packet
+        with self._lock:
+            if frame_id == self._jpeg_id:
+                return self._jpeg
+        frame = draw_faces(frame.copy(), self.faces)
+        ok, buf = cv2.imencode(
+            ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return None
+        with self._lock:
+            self._jpeg_id, self._jpeg = frame_id, buf.tobytes()
+            return self._jpeg
+
+    def mjpeg(self):
+        """multipart/x-mixed-replace body; one part per new frame"""
+        pipeline = self.attach()
+        try:
+            last_id = None
+            while pipeline.running:
+                packet = pipeline.latest_frame()
+                if packet is None or packet[0] == last_id:
+                    time.sleep(0.01)
+                    continue
+                last_id = packet[0]
+                data = self.jpeg(packet)
+                if data is None:
+                    continue
+                yield (b"--frame\r\nContent-Type: image/jpeg\r\n"
+                       b"Content-Length: " + str(len(data)).encode() +
+                       b"\r\n\r\n" + data + b"\r\n")
+        finally:
+            self.detach()
+
+    def grab_frames(self, count, interval):
+        """
+        Collect `count` distinct frames `interval` seconds apart, with
+        attendance marking suspended meanwhile.
+        """
+        with self._lock:
+            self._enrolling += 1
+        pipeline = self.attach()
+        frames, last_id = [], None
+        try:
+            deadline = time.monotonic() + 10 + count * interval
+            while len(frames) < count and time.monotonic() < deadline:
+                packet = pipeline.latest_frame()
+                if packet is not None and packet[0] != last_id:
+                    last_id = packet[0]
+                    frames.append(packet[2].copy())
+                    time.sleep(interval)
+                else:
+                    time.sleep(0.01)
+        finally:
+            self.detach()
+            with self._lock:
+                self._enrolling -= 1
+        return frames
+
+
+def list_users(index):
+    index.refresh()
+    return index.users()
+
+
+def create_app(source_factory=lambda: open_source(0), store=None, service=None,
+               index=None):
+    """
+    Build the Flask app. Pass e.g. `lambda: SyntheticSource()` as
+    source_factory to run without a camera.
+    """
+    app = Flask(__name__)
+    store = store or AttendanceStore(ATTENDANCE_DB, ATTENDANCE_PATH)
+    service = service or AttendanceService(source_factory, store)
+    index = index or DatasetIndex(DATASET_DIR)
+    app.config["service"] = service
+    app.config["store"] = store
+    app.config["index"] = index
+
+    def refresh_encodings():
+        # imported here: encoder pulls in dlib and the face models, which
+        # the web app only needs once somebody registers or is deleted
+        from encoder import update_encodings
+        with _encodings_lock:
+            update_encodings()
+        service.reload_gallery()
+
+    @app.route("/")
+    def dashboard():
+        return render_template("dashboard.html")
+
+    @app.route("/mark_attendance")
+    def mark_attendance():
+        service.begin_session()
+        return render_template("mark_attendance.html")
+
+    @app.route("/video_feed")
+    def video_feed():
+        return Response(service.mjpeg(),
+                        mimetype="multipart/x-mixed-replace; boundary=frame")
+
+    @app.route("/check_status")
+    def check_status():
+        event = service.last_event
+        if event is None:
+            return jsonify({"status": "waiting"})
+        status = "already_marked" if event["already_marked"] else "success"
+        return jsonify(dict(event, status=status))
+
+    @app.route("/view_attendance")
+    def view_attendance():
+        store.poll()
+        limit = request.args.get("limit", VIEW_ATTENDANCE_LIMIT, type=int)
+        rows = store.query(descending=True, limit=limit)
+        return render_template("view_attendance.html", attendance=[CSV_HEADER] + rows)
+
+    @app.route("/clear_attendance", methods=["POST"])
+    def clear_attendance():
+        store.clear()
+        return redirect(url_for("view_attendance"))
+
+    @app.route("/add_user", methods=["GET", "POST"])
+    def add_user():
+        if request.method == "GET":
+            return render_template("add_user.html")
+        name = sanitize_name(request.form.get("name", ""))
+        if not name:
+            abort(400, "Use letters/numbers (spaces allowed).")
+        user_dir = os.path.join(DATASET_DIR, name)
+        os.makedirs(user_dir, exist_ok=True)
+        index.refresh_user(name)
+        # after the highest existing number: gaps must not be refilled over
+        start = next_free_index(user_dir)
+        for i, frame in enumerate(service.grab_frames(ADD_USER_SHOTS, ADD_USER_INTERVAL)):
+            path = os.path.join(user_dir, f"img_{start + i}.jpg")
+            if cv2.imwrite(path, frame):
+                index.add_image(path)
+        threading.Thread(target=refresh_encodings, daemon=True).start()
+        return redirect(url_for("view_users"))
+
+    @app.route("/view_users")
+    def view_users():
+        return render_template("view_user.html", users=list_users(index))
+
+    @app.route("/delete_user/<user>", methods=["POST"])
+    def delete_user(user):
+        if user not in list_users(index):
+            abort(404)
+        shutil.rmtree(os.path.join(DATASET_DIR, user))
+        index.remove_user(user)
+        threading.Thread(target=refresh_encodings, daemon=True).start()
+        return redirect(url_for("view_users"))
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Smart Attendance web server")
+    parser.add_argument("--source", default="0",
+                        help="camera index, video file, stream URL or 'synthetic'")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+
+    app = create_app(lambda: open_source(args.source))
+    app.run(host=args.host, port=args.port, threaded=True)